@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import threading
+
+import pytest
+
+from uberserk import urequests
+
+
+class FakeSocket:
+    """Non-blocking socket replaying reads, ``None`` for no data yet."""
+
+    def __init__(self, reads=()):
+        self.reads = list(reads)
+        self.written = []
+
+    def setblocking(self, flag):
+        pass
+
+    def readinto(self, buf):
+        if not self.reads:
+            return 0
+        data = self.reads.pop(0)
+        if data is None:
+            return None
+        n = min(len(data), len(buf))
+        buf[:n] = data[:n]
+        if n < len(data):
+            self.reads.insert(0, data[n:])
+        return n
+
+    def write(self, data):
+        self.written.append(bytes(data))
+        return len(data)
+
+    def close(self):
+        pass
+
+
+def stream(pool, reads):
+    response = urequests.Response(FakeSocket(reads))
+    response.pool = pool
+    return response
+
+
+LONG = b'x' * (urequests.BUFFER_SIZE + 100)  # spills out of the line buffer
+READS = [b'{"a": 1}\n{"b"', None, b': 2}\r\n\n', LONG[:700],
+         LONG[700:] + b'\n', b'tail']
+LINES = [b'{"a": 1}', b'{"b": 2}', b'', LONG, b'tail']
+
+
+def test_iter_lines_reuses_buffers():
+    pool = urequests.BufferPool()
+    for _ in range(500):
+        response = stream(pool, READS)
+        lines = [line for line in response.iter_lines() if line is not None]
+        response.close()
+        assert lines == LINES
+    assert pool.misses == 0
+    assert len(pool._free) == pool.count
+
+
+def test_buffered_writes_reuse_buffers():
+    pool = urequests.BufferPool()
+    payload = b'y' * (urequests.BUFFER_SIZE * 2)
+    for i in range(500):
+        sock = FakeSocket()
+        buf = pool.take()
+        w = urequests._Buffered(sock, buf)
+        w.write('POST /api/board/game/%d/move/e2e4 HTTP/1.1\r\n' % i)
+        w.write(b'Content-Length: 2048\r\n\r\n')
+        w.write(payload)
+        w.flush()
+        pool.give(buf)
+        assert b''.join(sock.written).endswith(b'\r\n\r\n' + payload)
+    assert pool.misses == 0
+
+
+def test_failed_write_gives_buffer_back():
+    class Broken(FakeSocket):
+        def write(self, data):
+            raise OSError(104)
+
+    pool = urequests.BufferPool()
+    connection = urequests.Connection('http://localhost/', pool=pool)
+    connection.sock = Broken()
+    for _ in range(50):
+        with pytest.raises(OSError):
+            connection._send(b'POST', b'api/x', b'data', False, {})
+    assert pool.misses == 0
+    assert len(pool._free) == pool.count
+
+
+def test_pool_shared_by_threads():
+    pool = urequests.BufferPool(count=2)
+    errors = []
+
+    def work():
+        try:
+            for _ in range(2000):
+                pool.give(pool.take())
+        except Exception as e:  # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert len(pool._free) <= pool.count
@@ -16,4 +16,6 @@ from .enums import Variant  # noqa: F401
 from .enums import Color  # noqa: F401
 from .enums import Room  # noqa: F401
 from .enums import Mode  # noqa: F401
-from .enums import Position  # noqa: F401
\ No newline at end of file
+from .enums import Position  # noqa: F401
+from .enums import DeclineReason  # noqa: F401
+from .jsonlib import BACKEND as JSON_BACKEND  # noqa: F401
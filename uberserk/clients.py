@@ -3,15 +3,34 @@
 import urllib.parse
 
 from . import exceptions
+from . import jsonlib as json
 from . import models
+from . import ratelimit
+from . import streams
+from . import utils
 from . import urequests as requests
 from .datetime import datetime as dtt
-from .formats import JSON, TEXT
+from .formats import IDLE_SLEEP_MS, JSON, NDJSON, PGN, TEXT, JsonHandler
+from .metrics import Metrics
 from .utils import noop
 
 # Base URL for the API
 API_URL = 'https://lichess.org/'
 
+# Maximum number of IDs the API accepts in a single bulk call
+USERS_BATCH_SIZE = 300
+STATUSES_BATCH_SIZE = 100
+
+# Maximum number of game IDs the API exports in a single call
+EXPORT_BATCH_SIZE = 300
+
+# Number of bulk batches requested at once
+BULK_WORKERS = 2
+
+# File the warm state of a client is saved to, see Client.snapshot
+SNAPSHOT_PATH = 'uberserk.json'
+SNAPSHOT_VERSION = 1
+
 __all__ = [
     'Account',
     'Board',
@@ -22,59 +41,207 @@ __all__ = [
 
 
 class BaseClient:
-    def __init__(self, auth_token, base_url=None):
-        self._r = Requestor(auth_token, base_url or API_URL, default_fmt=JSON)
+    def __init__(self, auth_token, base_url=None, requestor=None):
+        self._r = requestor or Requestor(auth_token, base_url or API_URL,
+                                         default_fmt=JSON)
+
+
+class FmtClient(BaseClient):
+    """Client that can return PGN or not.
+
+    :param bool pgn_as_default: ``True`` if PGN should be the default format
+        for game exports when the format is not specified
+    """
+
+    def __init__(self, auth_token, base_url=None, requestor=None,
+                 pgn_as_default=False):
+        super().__init__(auth_token, base_url, requestor)
+        self.pgn_as_default = pgn_as_default
+
+    def _use_pgn(self, as_pgn=None):
+        # helper to merge default with provided arg
+        if as_pgn is not None:
+            return as_pgn
+        return self.pgn_as_default
 
 
 class Client(BaseClient):
-    def __init__(self, auth_token, base_url=None, pgn_as_default=False):
+    def __init__(self, auth_token, base_url=None, pgn_as_default=False,
+                 intern=False, max_body=None, gc_policy=None, journal=None):
         super().__init__(auth_token, base_url)
-        self.account = Account(auth_token, base_url)
-        self.board = Board(auth_token, base_url)
-        self.challenges = Challenges(auth_token, base_url)
-        self.games = Games(auth_token, base_url)
-        self.teams = Teams(auth_token, base_url)
-        self.users = Users(auth_token, base_url)
+        self._r.max_body = max_body
+        if gc_policy is not None:
+            # record pauses along with the other client metrics
+            gc_policy.metrics = self._r.metrics
+            gc_policy.install()
+        self._r.gc_policy = self.gc_policy = gc_policy
+        if intern:
+            # share keys and enum-like values among all decoded objects
+            interner = utils.Interner()
+            self._r.default_fmt = JsonHandler(JSON.mime_type,
+                                              interner=interner)
+            self._r.ndjson_fmt = JsonHandler(NDJSON.mime_type,
+                                             interner=interner)
+        self.account = Account(auth_token, base_url, requestor=self._r)
+        self.board = Board(auth_token, base_url, requestor=self._r)
+        self.board.journal = journal
+        self.challenges = Challenges(auth_token, base_url, requestor=self._r)
+        self.games = Games(auth_token, base_url, requestor=self._r,
+                           pgn_as_default=pgn_as_default)
+        self.teams = Teams(auth_token, base_url, requestor=self._r)
+        self.users = Users(auth_token, base_url, requestor=self._r)
+
+    @property
+    def metrics(self):
+        """Counters and timers of all requests made by this client."""
+        return self._r.metrics
+
+    def snapshot(self, path=SNAPSHOT_PATH):
+        """Save the warm state of the client to a file, e.g. on flash.
+
+        Saved are the resolved addresses of all hosts, the account and the
+        ongoing games last fetched, and the moves seen in each open game
+        stream. Take it right before a deep sleep and :meth:`restore` it on
+        wake, so that neither DNS nor those requests are needed again.
+
+        :param str path: file to save to, replaced as by
+            :func:`~uberserk.utils.replace_file`
+        """
+        state = {
+            'version': SNAPSHOT_VERSION,
+            'dns': requests.dns_snapshot(),
+            'account': self.account._raw,
+            'ongoing': self.games._ongoing,
+            'moves': {game_id: tracker.moves for game_id, tracker
+                      in self.board._trackers.items()},
+        }
+        data = json.dumps(state)
+        if isinstance(data, str):
+            data = data.encode()
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        utils.replace_file(tmp, path)
+
+    def restore(self, path=SNAPSHOT_PATH):
+        """Restore the warm state saved by :meth:`snapshot`.
+
+        Afterwards ``account.get(cached=True)`` and
+        ``games.get_ongoing(cached=True)`` answer without a request and game
+        streams opened with :meth:`Board.stream_game_state` resume from the
+        moves seen before. A cached address is resolved again once a
+        connection to it fails.
+
+        :param str path: file to restore from
+        :return: ``True`` if a snapshot was restored
+        :rtype: bool
+        """
+        utils.recover_file(path + '.tmp', path)
+        try:
+            with open(path, 'rb') as f:
+                state = json.loads(f.read())
+        except (OSError, ValueError):
+            return False
+        if state.get('version') != SNAPSHOT_VERSION:
+            return False
+        requests.dns_restore(state.get('dns') or {})
+        self.account._raw = state.get('account')
+        self.games._ongoing = state.get('ongoing')
+        for game_id, moves in (state.get('moves') or {}).items():
+            tracker = streams.MoveTracker()
+            tracker.update(moves)
+            self.board._trackers[game_id] = tracker
+        return True
 
 
 class Requestor:
-    def __init__(self, auth_token=None, base_url=None, default_fmt=JSON):
+    def __init__(self, auth_token=None, base_url=None, default_fmt=JSON,
+                 rate_limiter=None):
         self.base_url = base_url
         self.auth_token = auth_token
         self.default_fmt = default_fmt
+        # handler of newline-delimited JSON, interning like default_fmt
+        self.ndjson_fmt = NDJSON
+        self.rate_limiter = rate_limiter or ratelimit.for_token(auth_token)
+        self.metrics = Metrics()
+        self.hot = None
+        self.max_body = None
+        self.gc_policy = None
+        # buffers reused by all requests and streams of the client
+        self.pool = requests.BufferPool()
+
+    def open_hot_connection(self):
+        """Open a persistent connection reserved for latency-critical calls.
+
+        Requests made with ``hot=True`` use it instead of opening a new
+        connection each time.
+        """
+        if self.hot is None:
+            self.hot = requests.Connection(self.base_url, pool=self.pool)
+        self.hot.open()
 
     def request(self, method, path, *args, fmt=None, converter=noop, **kwargs):
         """Make a request for a resource in a paticular format.
+
+        Requests are paced by the rate limiter of the token. A 429 response
+        pauses all further requests of the token for the penalty window.
+
         :param str method: HTTP verb
         :param str path: the URL suffix
         :param fmt: the format handler
         :type fmt: :class:`~berserk.formats.FormatHandler`
         :param func converter: function to handle field conversions
+        :param bool hot: send over the hot connection if there is one
         :return: response
         :raises berserk.exceptions.ResponseError: if the status is >=400
+        :raises berserk.exceptions.RateLimitError: if the status is 429
+        :raises berserk.exceptions.BodyTooLargeError: if the body or a
+            streamed line, once iterated to, is longer than :attr:`max_body`
         """
         fmt = fmt or self.default_fmt
-        kwargs['headers'] = {'Authorization': 'Bearer {}'.format(self.auth_token)}
+        headers = kwargs.pop('headers', None)
+        kwargs['headers'] = dict(fmt.headers)
+        if headers:
+            kwargs['headers'].update(headers)
+        kwargs['headers']['Authorization'] = 'Bearer {}'.format(self.auth_token)
         url = urllib.parse.urljoin(self.base_url, path)
         if 'params' in kwargs:
-            url = url.rstrip('?') + '?' + urllib.parse.urlencode(kwargs['params'], doseq=True)
-            kwargs.pop('params')
+            params = _query(kwargs.pop('params'))
+            if params:
+                url = url.rstrip('?') + '?' + urllib.parse.urlencode(params, doseq=True)
 
         is_stream = kwargs.get('stream')
+        idle = kwargs.pop('idle', False)
+        hot = kwargs.pop('hot', False) and self.hot is not None
         print('%s %s %s params=%s data=%s json=%s',
                   'stream' if is_stream else 'request', method, url,
                   kwargs.get('params'), kwargs.get('data'), kwargs.get('json'))
+        self.rate_limiter.acquire(path, metrics=self.metrics)
+        self.metrics.incr('requests')
         try:
-            response = requests.request(method, url, *args, **kwargs)
+            if hot:
+                response = self.hot.request(method, url, *args, **kwargs)
+            else:
+                response = requests.request(method, url, *args,
+                                            pool=self.pool, **kwargs)
         except Exception as e:
             raise exceptions.ApiError(e)
         # print('dir(response): %s' % dir(response))
         # print('response.status_code: %s' % response.status_code)
         # print('response.text: %s' % response.text)
+        if response.status_code == 429:
+            self.rate_limiter.penalize(response.retry_after, metrics=self.metrics)
+            raise exceptions.RateLimitError(response)
         if response.status_code != 200:
             raise exceptions.ResponseError(response)
 
-        return fmt.handle(response, is_stream=is_stream, converter=converter)
+        response.max_body = self.max_body
+        on_idle = self.gc_policy.idle if self.gc_policy is not None else None
+        try:
+            return fmt.handle(response, is_stream=is_stream,
+                              converter=converter, idle=idle, on_idle=on_idle)
+        except requests.BodyTooLarge as e:
+            raise exceptions.BodyTooLargeError(e)
 
     def get(self, *args, **kwargs):
         """Convenience method to make a GET request."""
@@ -85,14 +252,34 @@ class Requestor:
         return self.request('POST', *args, **kwargs)
 
 
+def _query(params):
+    # drop unset parameters and spell booleans the way the API expects
+    query = {}
+    for key, value in params.items():
+        if value is None:
+            continue
+        if value is True or value is False:
+            value = str(value).lower()
+        query[key] = value
+    return query
+
+
 class Account(BaseClient):
-    def get(self):
+    def __init__(self, auth_token, base_url=None, requestor=None):
+        super().__init__(auth_token, base_url, requestor)
+        self._raw = None
+
+    def get(self, cached=False):
         """Get your public information.
+        :param bool cached: return the information last fetched, if any,
+            without a request
         :return: public information about the authenticated user
         :rtype: dict
         """
-        path = 'api/account'
-        return self._r.get(path, converter=models.Account.convert)
+        if not cached or self._raw is None:
+            path = 'api/account'
+            self._raw = self._r.get(path)
+        return models.Account.convert(dict(self._raw))
 
     def get_preferences(self):
         """Get your account preferences.
@@ -102,30 +289,183 @@ class Account(BaseClient):
         path = 'api/account/preferences'
         return self._r.get(path)['prefs']
 
-class Games(BaseClient):
+class Games(FmtClient):
     """Client for games-related endpoints."""
 
+    def __init__(self, auth_token, base_url=None, requestor=None,
+                 pgn_as_default=False):
+        super().__init__(auth_token, base_url, requestor, pgn_as_default)
+        self._ongoing = None
+
+    def export(self, game_id, as_pgn=None, moves=None, tags=None,
+               clocks=None, evals=None, opening=None, literate=None):
+        """Get one finished game as PGN or JSON.
+
+        :param str game_id: the ID of the game to export
+        :param bool as_pgn: whether to return the game in PGN format
+        :param bool moves: whether to include the PGN moves
+        :param bool tags: whether to include the PGN tags
+        :param bool clocks: whether to include clock comments in the PGN moves
+        :param bool evals: whether to include analysis evaluation comments in
+                           the PGN moves when available
+        :param bool opening: whether to include the opening name
+        :param bool literate: whether to include literate the PGN
+        :return: exported game, as JSON or PGN
+        """
+        path = 'game/export/%s' % game_id
+        params = {
+            'moves': moves,
+            'tags': tags,
+            'clocks': clocks,
+            'evals': evals,
+            'opening': opening,
+            'literate': literate,
+        }
+        if self._use_pgn(as_pgn):
+            return self._r.get(path, params=params, fmt=PGN)
+        return self._r.get(path, params=params,
+                           converter=models.Game.convert)
+
+    def export_by_player(self, username, as_pgn=None, since=None, until=None,
+                         max=None, vs=None, rated=None, perf_type=None,
+                         color=None, analysed=None, moves=None, tags=None,
+                         evals=None, opening=None):
+        """Stream the games of a player.
+
+        Games are handed over one at a time as they arrive.
+
+        :param str username: which player's games to return
+        :param bool as_pgn: whether to return the game in PGN format
+        :param int since: lowerbound on the game timestamp
+        :param int until: upperbound on the game timestamp
+        :param int max: limit the number of games returned
+        :param str vs: filter by username of the opponent
+        :param bool rated: filter by game mode (``True`` for rated,
+                           ``False`` for casual)
+        :param perf_type: filter by speed or variant
+        :type perf_type: :class:`~uberserk.enums.PerfType`
+        :param color: filter by the color of the player
+        :type color: :class:`~uberserk.enums.Color`
+        :param bool analysed: filter by analysis availability
+        :param bool moves: whether to include the PGN moves
+        :param bool tags: whether to include the PGN tags
+        :param bool evals: whether to include analysis evaluation comments in
+                           the PGN moves when available
+        :param bool opening: whether to include the opening name
+        :return: iterator over the exported games, as JSON or PGN
+        """
+        path = 'api/games/user/%s' % username
+        params = {
+            'since': since,
+            'until': until,
+            'max': max,
+            'vs': vs,
+            'rated': rated,
+            'perfType': perf_type,
+            'color': color,
+            'analysed': analysed,
+            'moves': moves,
+            'tags': tags,
+            'evals': evals,
+            'opening': opening,
+        }
+        if self._use_pgn(as_pgn):
+            return self._r.get(path, params=params, fmt=PGN, stream=True)
+        return self._r.get(path, params=params, fmt=self._r.ndjson_fmt,
+                           stream=True, converter=models.Game.convert)
+
+    def export_multi(self, *game_ids, as_pgn=None, moves=None, tags=None,
+                     clocks=None, evals=None, opening=None,
+                     batch_size=EXPORT_BATCH_SIZE):
+        """Stream multiple games by their IDs.
+
+        The IDs are exported in batches the server accepts, one batch after
+        another, and games are handed over one at a time as they arrive.
+
+        :param game_ids: one or more game IDs to export
+        :param bool as_pgn: whether to return the game in PGN format
+        :param bool moves: whether to include the PGN moves
+        :param bool tags: whether to include the PGN tags
+        :param bool clocks: whether to include clock comments in the PGN moves
+        :param bool evals: whether to include analysis evaluation comments in
+                           the PGN moves when available
+        :param bool opening: whether to include the opening name
+        :param int batch_size: maximum number of game IDs per request
+        :return: iterator over the exported games, as JSON or PGN
+        """
+        path = 'api/games/export/_ids'
+        params = {
+            'moves': moves,
+            'tags': tags,
+            'clocks': clocks,
+            'evals': evals,
+            'opening': opening,
+        }
+        if self._use_pgn(as_pgn):
+            kwargs = {'fmt': PGN}
+        else:
+            kwargs = {'fmt': self._r.ndjson_fmt,
+                      'converter': models.Game.convert}
+        for batch in utils.chunked(game_ids, batch_size):
+            yield from self._r.post(path, params=params, data=','.join(batch),
+                                    stream=True, **kwargs)
+
     # move this to Account?
-    def get_ongoing(self, count=10):
+    def get_ongoing(self, count=10, cached=False):
         """Get your currently ongoing games.
         :param int count: number of games to get
+        :param bool cached: return the games last fetched, if any, without a
+            request
         :return: some number of currently ongoing games
         :rtype: list
         """
-        path = 'api/account/playing'
-        params = {'nb': count}
-        return self._r.get(path, params=params)['nowPlaying']
+        if not cached or self._ongoing is None:
+            path = 'api/account/playing'
+            params = {'nb': count}
+            self._ongoing = self._r.get(path, params=params)['nowPlaying']
+        return self._ongoing
 
 class Board(BaseClient):
     """Client for physical board or external application endpoints."""
 
-    def stream_incoming_events(self):
+    def __init__(self, auth_token, base_url=None, requestor=None):
+        super().__init__(auth_token, base_url, requestor)
+        self._pending = {}
+        self._positions = {}
+        self._trackers = {}
+        self._broadcasts = {}
+        self.journal = None
+
+    def enable_hot_connection(self):
+        """Send moves, draw offers and resignations over a pre-opened
+        connection reserved for them.
+        """
+        self._r.open_hot_connection()
+
+    def keep_warm(self):
+        """Reopen the hot connection if the server has likely closed it.
+
+        Call when idle so that the next move does not pay for the handshake.
+        """
+        if self._r.hot is not None:
+            self._r.hot.warm()
+
+    def stream_incoming_events(self, timeout=streams.STALE_MS, types=None):
         """Get your realtime stream of incoming events.
+
+        The stream reconnects by itself when the connection dies or stays
+        silent for too long, events replayed after a reconnect are dropped.
+
+        :param int timeout: milliseconds without data after which the
+            connection is considered dead
+        :param types: event types to hand over, such as ``gameStart``; other
+            events are skipped without being decoded
         :return: stream of incoming events
-        :rtype: iterator over the stream of events
+        :rtype: :class:`~uberserk.streams.EventStream`
         """
         path = 'api/stream/event'
-        yield from self._r.get(path, stream=True)
+        fmt = self._r.default_fmt.with_types(types) if types else None
+        return streams.EventStream(self._r, path, timeout=timeout, fmt=fmt)
 
     def seek(self, time, increment, rated=False, variant='standard',
              color='random', rating_range=None):
@@ -163,24 +503,201 @@ class Board(BaseClient):
         # and return the time elapsed
         return dtt.now() - start
 
-    def stream_game_state(self, game_id):
+    def stream_game_state(self, game_id, timeout=streams.STALE_MS,
+                          track_position=False, coalesce=False):
         """Get the stream of events for a board game.
+
+        The stream reconnects by itself when the connection dies or stays
+        silent for too long and only hands over states not seen before.
+
+        A consumer falling behind with ``coalesce`` gets only the latest of
+        the states that piled up, the states it supersedes are not decoded.
+        Its ``newMoves`` holds the moves of all of them.
+
         :param str game_id: ID of a game
+        :param int timeout: milliseconds without data after which the
+            connection is considered dead
+        :param bool track_position: keep the current position in the
+            ``position`` attribute of the stream, also used to validate
+            moves in :meth:`make_move`
+        :param bool coalesce: skip states superseded before they were read
         :return: iterator over game states
+        :rtype: :class:`~uberserk.streams.GameStream`
         """
         path = 'api/board/game/stream/%s' % game_id
-        yield from self._r.get(path, stream=True,
-                               converter=models.GameState.convert)
+        fmt = None
+        if coalesce:
+            fmt = self._r.default_fmt.with_coalescing(('gameState',))
+        return streams.GameStream(self._r, path, timeout=timeout, fmt=fmt,
+                                  converter=models.GameState.convert,
+                                  game_id=game_id, pending=self._pending,
+                                  track_position=track_position,
+                                  positions=self._positions,
+                                  trackers=self._trackers)
+
+    def subscribe_incoming_events(self, size=8, policy=streams.LATEST):
+        """Subscribe to the incoming events shared by all subscribers.
+
+        The stream is opened with the first subscriber and read once for
+        all of them, see :class:`~uberserk.streams.Broadcast`.
+
+        :param int size: maximum number of events queued
+        :param str policy: what to do when the queue is full
+        :rtype: :class:`~uberserk.streams.Subscription`
+        """
+        return self._broadcast(
+            'events', self.stream_incoming_events).subscribe(size, policy)
 
-    def make_move(self, game_id, move):
+    def subscribe_game_state(self, game_id, size=8, policy=streams.LATEST,
+                             **kwargs):
+        """Subscribe to the events of a board game shared by all subscribers.
+
+        The stream is opened with the first subscriber, with the keyword
+        arguments of :meth:`stream_game_state`, and read once for all of
+        them, see :class:`~uberserk.streams.Broadcast`.
+
+        :param str game_id: ID of a game
+        :param int size: maximum number of events queued
+        :param str policy: what to do when the queue is full
+        :rtype: :class:`~uberserk.streams.Subscription`
+        """
+        return self._broadcast(
+            game_id, lambda: self.stream_game_state(game_id, **kwargs)
+        ).subscribe(size, policy)
+
+    def _broadcast(self, key, open_stream):
+        broadcast = self._broadcasts.get(key)
+        if broadcast is None or broadcast.done:
+            broadcast = streams.Broadcast(open_stream())
+            self._broadcasts[key] = broadcast
+        return broadcast
+
+    def make_move(self, game_id, move, validate=False):
         """Make a move in a board game.
+
+        The time until the move shows up in the game stream is recorded in
+        the ``move_rtt`` timer of the client metrics. The GC policy of the
+        client, if any, does not collect until the response is read. With a
+        journal the move is recorded before it is sent and acknowledged once
+        the server answered, see :meth:`replay_journal`.
+
         :param str game_id: ID of a game
         :param str move: move to make
+        :param bool validate: reject moves illegal in the position tracked
+            by the game stream without a request, see
+            :meth:`stream_game_state`
         :return: success
         :rtype: bool
+        :raises berserk.exceptions.IllegalMoveError: if validation fails
         """
+        position = self._positions.get(game_id)
+        if validate and position is not None and not position.is_legal(move):
+            self._r.metrics.incr('illegal_moves')
+            raise exceptions.IllegalMoveError('Illegal move: %s' % move)
+        seq = None
+        if self.journal is not None:
+            tracker = self._trackers.get(game_id)
+            seq = self.journal.record(game_id, move,
+                                      tracker.ply if tracker else -1)
+        return self._send_move(game_id, move, seq)
+
+    def _send_move(self, game_id, move, seq):
+        # the journal entry is acknowledged once the server answered, a move
+        # lost on the way or throttled is left for replay_journal
         path = 'api/board/game/%s/move/%s' % (game_id, move)
-        return self._r.post(path)['ok']
+        start = utils.ticks_ms()
+        self._pending[game_id] = (move, start)
+        policy = self._r.gc_policy
+        if policy is not None:
+            policy.hold()
+        try:
+            result = self._r.post(path, hot=True)['ok']
+        except exceptions.ResponseError as e:
+            self._pending.pop(game_id, None)
+            if seq is not None and \
+                    not isinstance(e, exceptions.RateLimitError):
+                self.journal.ack(seq)  # rejected, a resend would be too
+            raise
+        except Exception:
+            self._pending.pop(game_id, None)
+            raise
+        finally:
+            if policy is not None:
+                policy.release()
+        if seq is not None:
+            self.journal.ack(seq)
+        self._r.metrics.observe('move_request',
+                                utils.ticks_diff(utils.ticks_ms(), start))
+        return result
+
+    def replay_journal(self, timeout=streams.STALE_MS):
+        """Send the moves left unacknowledged in the journal by a reset.
+
+        The moves of each game are read from its game stream first. Journaled
+        moves the server already has, or which no longer fit the game, are
+        only acknowledged. Games whose stream does not answer in time, and
+        moves whose request fails before the server answers, are left for the
+        next replay.
+
+        :param int timeout: milliseconds to wait for each game stream
+        :return: the moves sent again as ``(game_id, move)``
+        :rtype: list
+        """
+        journal = self.journal
+        replayed = []
+        if journal is None:
+            return replayed
+        states = {}
+        for seq in sorted(journal.pending):
+            game_id, move, ply = journal.pending[seq]
+            if game_id not in states:
+                states[game_id] = self._read_state(game_id, timeout)
+            state = states[game_id]
+            if state is None:
+                continue
+            if state.get('status') not in streams.LIVE_STATUSES:
+                journal.ack(seq)
+                continue
+            moves = state['moves']
+            if ply < 0:
+                # without the ply only the last move of each side is known
+                stale = move in moves[-2:]
+            else:
+                stale = ply != len(moves)
+            if stale:
+                journal.ack(seq)
+                continue
+            try:
+                # resent under its own entry, acknowledged once answered
+                self._send_move(game_id, move, seq)
+            except exceptions.ApiError:
+                continue
+            moves.append(move)
+            replayed.append((game_id, move))
+        journal.flush()
+        return replayed
+
+    def _read_state(self, game_id, timeout):
+        # first state of a game stream of its own, moves as a list
+        path = 'api/board/game/stream/%s' % game_id
+        stream = streams.GameStream(self._r, path, game_id=game_id)
+        deadline = utils.ticks_add(utils.ticks_ms(), timeout)
+        try:
+            while utils.ticks_diff(deadline, utils.ticks_ms()) > 0:
+                event = next(stream)
+                if event and event.get('type') == 'gameFull':
+                    state = event['state']
+                    state['moves'] = state.get('moves', '').split()
+                    return state
+                if not event:
+                    utils.sleep_ms(IDLE_SLEEP_MS)
+        except exceptions.ResponseError:
+            return {}  # no such game
+        except StopIteration:
+            pass
+        finally:
+            stream.close()
+        return None
 
     def post_message(self, game_id, text, spectator=False):
         """Post a message in a board game.
@@ -202,7 +719,7 @@ class Board(BaseClient):
         :rtype: bool
         """
         path = 'api/board/game/%s/abort' % game_id
-        return self._r.post(path)['ok']
+        return self._r.post(path, hot=True)['ok']
 
     def resign_game(self, game_id):
         """Resign a board game.
@@ -211,7 +728,7 @@ class Board(BaseClient):
         :rtype: bool
         """
         path = 'api/board/game/%s/resign' % game_id
-        return self._r.post(path)['ok']
+        return self._r.post(path, hot=True)['ok']
 
     def handle_draw_offer(self, game_id, accept):
         """Create, accept, or decline a draw offer.
@@ -228,7 +745,7 @@ class Board(BaseClient):
         """
         accept = "yes" if accept else "no"
         path = '/api/board/game/%s/draw/%s' % (game_id, accept)
-        return self._r.post(path)['ok']
+        return self._r.post(path, hot=True)['ok']
 
     def offer_draw(self, game_id):
         """Offer a draw in the given game.
@@ -258,18 +775,28 @@ class Board(BaseClient):
 class Users(BaseClient):
     """Client for user-related endpoints."""
 
-    def get_realtime_statuses(self, *user_ids):
+    def get_realtime_statuses(self, *user_ids, batch_size=STATUSES_BATCH_SIZE,
+                              workers=BULK_WORKERS):
         """Get the online, playing, and streaming statuses of players.
 
-        Only id and name fields are returned for offline users.
+        Only id and name fields are returned for offline users. Large inputs
+        are split into batches the server accepts and the batches are
+        requested concurrently.
 
         :param user_ids: one or more user IDs (names)
-        :return: statuses of given players
-        :rtype: list
+        :param int batch_size: maximum number of IDs per request
+        :param int workers: maximum number of concurrent requests
+        :return: iterator over statuses of given players in input order,
+            repeated for repeated IDs
+        :rtype: iter
         """
         path = 'api/users/status'
-        params = {'ids': ','.join(user_ids)}
-        return self._r.get(path, params=params)
+
+        def fetch(batch):
+            params = {'ids': ','.join(batch)}
+            return self._r.get(path, params=params)
+
+        return self._fan_out(fetch, user_ids, batch_size, workers)
 
     def get_all_top_10(self):
         """Get the top 10 players for each speed and variant.
@@ -278,7 +805,7 @@ class Users(BaseClient):
         :rtype: dict
         """
         path = 'player'
-        return self._r.get(path, fmt=JSON)
+        return self._r.get(path)
 
     def get_leaderboard(self, perf_type, count=10):
         """Get the leaderboard for one speed or variant.
@@ -290,7 +817,7 @@ class Users(BaseClient):
         :rtype: list
         """
         path = 'player/top/%s/%s' % (count, perf_type)
-        return self._r.get(path, fmt=JSON)['users']
+        return self._r.get(path)['users']
 
     def get_public_data(self, username):
         """Get the public data for a user.
@@ -312,16 +839,42 @@ class Users(BaseClient):
         path = 'api/user/%s/activity' % username
         return self._r.get(path, converter=models.Activity.convert)
 
-    def get_by_id(self, *usernames):
+    def get_by_id(self, *usernames, batch_size=USERS_BATCH_SIZE,
+                  workers=BULK_WORKERS, fields=None):
         """Get multiple users by their IDs.
 
+        Large inputs are split into batches the server accepts and the
+        batches are requested concurrently.
+
         :param usernames: one or more usernames
-        :return: user data for the given usernames
-        :rtype: list
+        :param int batch_size: maximum number of usernames per request
+        :param int workers: maximum number of concurrent requests
+        :param list fields: locations of the fields to keep, such as
+            ``perfs.blitz.rating``; all if ``None``
+        :return: iterator over user data for the given usernames in input
+            order, repeated for repeated usernames
+        :rtype: iter
         """
         path = 'api/users'
-        return self._r.post(path, data=','.join(usernames),
-                            converter=models.User.convert)
+        if fields and 'id' not in fields:
+            fields = list(fields) + ['id']  # needed to restore input order
+        converter = models.User.converter(fields)
+
+        def fetch(batch):
+            return self._r.post(path, data=','.join(batch),
+                                converter=converter)
+
+        return self._fan_out(fetch, usernames, batch_size, workers)
+
+    def _fan_out(self, fetch, ids, batch_size, workers):
+        batches = list(utils.chunked(ids, batch_size))
+        for batch, users in zip(batches, utils.fan_out(fetch, batches, workers)):
+            # the server does not guarantee order and skips unknown users
+            by_id = {user['id']: user for user in users}
+            for user_id in batch:
+                user = by_id.get(user_id.lower())
+                if user is not None:
+                    yield user
 
     def get_live_streamers(self):
         """Get basic information about currently streaming users.
@@ -332,27 +885,31 @@ class Users(BaseClient):
         path = 'streamer/live'
         return self._r.get(path)
 
-    def get_users_followed(self, username):
+    def get_users_followed(self, username, fields=None):
         """Stream users followed by a user.
 
         :param str username: a username
+        :param list fields: locations of the fields to keep, such as
+            ``perfs.blitz.rating``; all if ``None``
         :return: iterator over the users the given user follows
         :rtype: iter
         """
         path = '/api/user/%s/following' % username
-        return self._r.get(path, stream=True, fmt=JSON,
-                           converter=models.User.convert)
+        return self._r.get(path, stream=True,
+                           converter=models.User.converter(fields))
 
-    def get_users_following(self, username):
+    def get_users_following(self, username, fields=None):
         """Stream users who follow a user.
 
         :param str username: a username
+        :param list fields: locations of the fields to keep, such as
+            ``perfs.blitz.rating``; all if ``None``
         :return: iterator over the users that follow the given user
         :rtype: iter
         """
         path = '/api/user/%s/followers' % username
-        return self._r.get(path, stream=True, fmt=JSON,
-                           converter=models.User.convert)
+        return self._r.get(path, stream=True,
+                           converter=models.User.converter(fields))
 
     def get_rating_history(self, username):
         """Get the rating history of a user.
@@ -367,16 +924,18 @@ class Users(BaseClient):
 
 class Teams(BaseClient):
 
-    def get_members(self, team_id):
+    def get_members(self, team_id, fields=None):
         """Get members of a team.
 
         :param str team_id: ID of a team
+        :param list fields: locations of the fields to keep, such as
+            ``perfs.blitz.rating``; all if ``None``
         :return: users on the given team
         :rtype: iter
         """
         path = 'team/%s/users' % team_id
-        return self._r.get(path, fmt=JSON, stream=True,
-                           converter=models.User.convert)
+        return self._r.get(path, stream=True,
+                           converter=models.User.converter(fields))
 
     def join(self, team_id):
         """Join a team.
@@ -438,18 +997,32 @@ class Challenges(BaseClient):
 
     def accept(self, challenge_id):
         """Accept an incoming challenge.
+
+        Sent over the hot connection if there is one, see
+        :meth:`Board.enable_hot_connection`.
+
         :param str challenge_id: id of the challenge to accept
         :return: success indicator
         :rtype: bool
         """
         path = 'api/challenge/{}/accept'.format(challenge_id)
-        return self._r.post(path)['ok']
+        return self._r.post(path, hot=True)['ok']
 
-    def decline(self, challenge_id):
+    def decline(self, challenge_id, reason=None):
         """Decline an incoming challenge.
+
+        Sent over the hot connection if there is one, see
+        :meth:`Board.enable_hot_connection`.
+
         :param str challenge_id: id of the challenge to decline
+        :param str reason: reason shown to the challenger, see
+            :class:`~uberserk.enums.DeclineReason`
         :return: success indicator
         :rtype: bool
         """
         path = 'api/challenge/{}/decline'.format(challenge_id)
-        return self._r.post(path)['ok']
+        if reason is None:
+            return self._r.post(path, hot=True)['ok']
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        return self._r.post(path, data='reason=' + reason, headers=headers,
+                            hot=True)['ok']
@@ -83,4 +83,16 @@ class ResponseError(ApiError):
                 raise Exception(http_error_msg)
 
         except Exception as e:
-            return e
\ No newline at end of file
+            return e
+
+
+class RateLimitError(ResponseError):
+    """Response with HTTP 429, requests are paused for the penalty window."""
+
+
+class BodyTooLargeError(ApiError):
+    """Response body or streamed line longer than the client allows."""
+
+
+class IllegalMoveError(BerserkError):
+    """Move rejected locally as illegal in the tracked position."""
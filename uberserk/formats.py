@@ -1,8 +1,13 @@
 # -*- coding: utf-8 -*-
 
-import ujson as json
+from . import exceptions
+from . import jsonlib as json
 
 from . import utils
+from .urequests import BodyTooLarge
+
+# Pause between reads of a stream with no new data when not polled
+IDLE_SLEEP_MS = 10
 
 
 class FormatHandler:
@@ -19,20 +24,42 @@ class FormatHandler:
         self.mime_type = mime_type
         self.headers = {'Accept': mime_type}
 
-    def handle(self, response, is_stream, converter=utils.noop):
+    def handle(self, response, is_stream, converter=utils.noop, idle=False,
+               on_idle=None):
         """Handle the response by returning the data.
 
         :param response: raw response
         :type response: :class:`requests.Response`
         :param bool is_stream: ``True`` if the response is a stream
         :param func converter: function to handle field conversions
+        :param bool idle: yield ``None`` when a stream has no new data instead
+            of waiting for it
+        :param func on_idle: called while waiting for new data of a stream,
+            such as :meth:`~uberserk.gcpolicy.GcPolicy.idle`; with ``idle``
+            the consumer handles the gaps instead
         :return: either all response data or an iterator of response data
         """
         if is_stream:
-            return map(converter, iter(self.parse_stream(response)))
+            return self._stream(response, converter, idle, on_idle)
         else:
             return converter(self.parse(response))
 
+    def _stream(self, response, converter, idle, on_idle):
+        try:
+            for item in self.parse_stream(response):
+                if item is not None:
+                    yield converter(item)
+                elif idle:
+                    yield None
+                else:
+                    if on_idle is not None:
+                        on_idle()
+                    utils.sleep_ms(IDLE_SLEEP_MS)
+        except BodyTooLarge as e:
+            raise exceptions.BodyTooLargeError(e)
+        finally:
+            response.close()
+
     def parse(self, response):
         """Parse all data from a response.
 
@@ -45,6 +72,8 @@ class FormatHandler:
     def parse_stream(self, response):
         """Yield the parsed data from a stream response.
 
+        ``None`` is yielded whenever the stream has no new data.
+
         :param response: raw response
         :type response: :class:`requests.Response`
         :return: iterator over the response data
@@ -55,12 +84,68 @@ class FormatHandler:
 class JsonHandler(FormatHandler):
     """Handle JSON data.
 
+    Stream lines whose ``"type"`` is not one of ``types`` are skipped without
+    being decoded. The type is peeked at in the raw bytes, which relies on
+    the server writing the top-level ``"type"`` before any nested one.
+
+    With an ``interner`` the keys and enum-like values of decoded objects
+    are shared between objects instead of allocated for each of them.
+
+    Stream lines whose type is one of ``coalesce`` are held back while more
+    data is available, a following line of the same type replaces the held
+    one without it being decoded. Only the latest of a burst is handed over.
+
     :param str mime_type: the MIME type for the format
-    :param decoder: the decoder to use for the JSON format
+    :param decoder: function decoding JSON, by default the fastest backend
+        available, see :mod:`uberserk.jsonlib`
+    :param types: event types to decode, all if ``None``
+    :param interner: table to intern strings with
+    :type interner: :class:`~uberserk.utils.Interner`
+    :param coalesce: event types of which only the latest is decoded
     """
 
-    def __init__(self, mime_type, decoder=None):
+    def __init__(self, mime_type, decoder=None, types=None, interner=None,
+                 coalesce=None):
         super().__init__(mime_type=mime_type)
+        self.decoder = decoder or json.loads
+        self.interner = interner
+        self.types = None
+        if types is not None:
+            self.types = set(t.encode() for t in types)
+        self.coalesce = None
+        if coalesce is not None:
+            self.coalesce = set(t.encode() for t in coalesce)
+
+    def with_types(self, types):
+        """Return a handler like this one decoding only some event types.
+
+        :param types: event types to decode
+        :rtype: :class:`JsonHandler`
+        """
+        return JsonHandler(self.mime_type, decoder=self.decoder, types=types,
+                           interner=self.interner,
+                           coalesce=_names(self.coalesce))
+
+    def with_coalescing(self, types):
+        """Return a handler like this one coalescing some event types.
+
+        :param types: event types of which only the latest is decoded
+        :rtype: :class:`JsonHandler`
+        """
+        return JsonHandler(self.mime_type, decoder=self.decoder,
+                           types=_names(self.types), interner=self.interner,
+                           coalesce=types)
+
+    def loads(self, data):
+        """Decode JSON data.
+
+        :param data: JSON
+        :type data: str or bytes
+        :return: decoded data
+        """
+        if self.interner is None:
+            return self.decoder(data)
+        return self.interner.walk(self.decoder(data))
 
     def parse(self, response):
         """Parse all JSON data from a response.
@@ -70,23 +155,64 @@ class JsonHandler(FormatHandler):
         :return: response data
         :rtype: JSON
         """
-        return json.loads(response.text)
+        return self.loads(response.content)
 
     def parse_stream(self, response):
         """Yield the parsed data from a stream response.
 
+        Lines are assembled across reads, so an object split between two
+        reads is decoded once complete.
+
         :param response: raw response
         :type response: :class:`requests.Response`
         :return: iterator over multiple JSON objects
         """
-        for chunk in response:
-            for line in chunk.splitlines():
-                print('line: {}'.format(line))
-                if line:
-                    decoded_line = line.decode('utf-8')
-                    yield json.loads(decoded_line)
-                else:
-                    yield {}
+        held = None
+        for line in response.iter_lines():
+            if line is None:
+                if held is not None:
+                    yield self.loads(held)
+                    held = None
+                yield None
+                continue
+            print('line: {}'.format(line))
+            kind = peek_type(line) if line and (
+                self.types is not None or self.coalesce is not None) else None
+            if line and self.types is not None and kind not in self.types:
+                continue
+            if line and self.coalesce is not None and kind in self.coalesce:
+                held = line  # supersedes the one held, if any
+                continue
+            if held is not None:
+                yield self.loads(held)
+                held = None
+            if line:
+                yield self.loads(line)
+            else:
+                yield {}
+        if held is not None:
+            yield self.loads(held)
+
+
+def _names(types):
+    return None if types is None else [t.decode() for t in types]
+
+
+def peek_type(line):
+    """Return the value of the first ``"type"`` key of a raw JSON line.
+
+    :param bytes line: a JSON object
+    :return: the type or ``None`` if there is no type
+    :rtype: bytes
+    """
+    start = line.find(b'"type"')
+    if start < 0:
+        return None
+    start = line.find(b'"', start + 6)
+    end = line.find(b'"', start + 1)
+    if start < 0 or end < 0:
+        return None
+    return line[start + 1:end]
 
 
 class TextHandler(FormatHandler):
@@ -98,14 +224,62 @@ class TextHandler(FormatHandler):
         return response.text
 
     def parse_stream(self, response):
-        for chunk in response:
-            for line in chunk.splitlines():
-                decoded_line = line.decode('utf-8')
-                print('decoded_line: {}'.format(decoded_line))
-                yield decoded_line
+        for line in response.iter_lines():
+            if line is None:
+                yield None
+                continue
+            decoded_line = line.decode('utf-8')
+            print('decoded_line: {}'.format(decoded_line))
+            yield decoded_line
+
+
+class PgnHandler(FormatHandler):
+    """Handle PGN data.
+
+    A stream is split into games as it arrives, only the game being read is
+    kept in memory.
+    """
+
+    def __init__(self):
+        super().__init__(mime_type='application/x-chess-pgn')
+
+    def parse(self, response):
+        return response.text
+
+    def parse_stream(self, response):
+        """Yield the games of a stream response one at a time.
+
+        :param response: raw response
+        :type response: :class:`requests.Response`
+        :return: iterator over the PGN of each game
+        """
+        lines = []
+        in_moves = False
+        for line in response.iter_lines():
+            if line is None:
+                yield None
+                continue
+            line = line.decode('utf-8')
+            if in_moves and line.startswith('['):
+                yield '\n'.join(lines).strip()
+                lines = []
+                in_moves = False
+            elif line and not line.startswith('['):
+                in_moves = True
+            lines.append(line)
+        game = '\n'.join(lines).strip()
+        if game:
+            yield game
+
 
 #: Basic text
 TEXT = TextHandler()
 
 #: Handles vanilla JSON
 JSON = JsonHandler(mime_type='application/json')
+
+#: Handles newline-delimited JSON
+NDJSON = JsonHandler(mime_type='application/x-ndjson')
+
+#: Handles PGN
+PGN = PgnHandler()
@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+
+"""Serve many boards on a LAN from a single upstream client.
+
+The gateway runs on a Linux host under the unix port of MicroPython, whose
+usocket and ussl the vendored urequests needs, and speaks plain HTTP to the
+boards, so they need no TLS. Boards use the usual client pointed at it, with
+one of the tokens the gateway accepts::
+
+    client = uberserk.Client(token, base_url='http://gateway.local:8080/')
+
+Requests of the boards are sent upstream by the client of the gateway and
+paced by its rate limiter, board game actions over its hot connection. The
+event stream and each game stream are opened upstream once and fanned out
+to all boards streaming them, each event serialized once for all boards.
+"""
+
+import errno
+import socket
+
+from . import exceptions
+from . import formats
+from . import jsonlib as json
+from . import streams
+from .utils import sleep_ms, ticks_ms, ticks_diff
+
+__all__ = ['Gateway']
+
+# Port the gateway listens on
+GATEWAY_PORT = 8080
+
+# Pause of the loop when nothing happened
+IDLE_MS = 10
+
+# Bytes of events queued for a streaming board before it is dropped as too
+# slow
+MAX_PENDING = 16384
+
+# Largest request accepted from a board
+MAX_REQUEST = 4096
+
+# Paths of the streams fanned out to the boards
+EVENTS_PATH = 'api/stream/event'
+GAME_STREAM_PREFIX = 'api/board/game/stream/'
+
+# Requests sent upstream over the hot connection
+HOT_PREFIXES = ('api/board/game/', 'api/challenge/')
+
+# Streams other than the fanned out ones, refused as they would hold up the
+# loop until they end: seeks stay open until paired, exports are long
+STREAM_PREFIXES = ('api/board/seek', 'api/stream/', 'api/games/user/',
+                   'api/games/export/')
+
+# Paths answered in newline-delimited JSON whatever the board accepts, as
+# (prefix, suffix)
+NDJSON_PATHS = (('api/user/', '/following'), ('api/user/', '/followers'),
+                ('team/', '/users'))
+
+REASONS = {200: 'OK', 400: 'Bad Request', 401: 'Unauthorized',
+           413: 'Payload Too Large', 429: 'Too Many Requests',
+           501: 'Not Implemented', 502: 'Bad Gateway'}
+
+
+class _Peer:
+    """Connection of a board."""
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.data = b''
+        self.out = []
+        self.pending = 0
+        self.feed = None
+        self.closing = False
+
+
+class _Feed:
+    """Upstream stream shared by the boards streaming the same path.
+
+    Events a board joining late still needs, the ``gameFull`` of a game kept
+    up to date and the ``gameStart`` of ongoing games, are kept in
+    :attr:`replay`.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.peers = []
+        self.replay = {}
+
+    def remember(self, event):
+        kind = event.get('type')
+        if kind == 'gameFull':
+            self.replay['full'] = event
+        elif kind == 'gameState' and 'full' in self.replay:
+            self.replay['full']['state'] = event
+        elif kind in ('gameStart', 'gameFinish'):
+            game = event.get('game') or {}
+            game_id = game.get('gameId') or game.get('id')
+            if kind == 'gameStart':
+                self.replay[game_id] = event
+            else:
+                self.replay.pop(game_id, None)
+
+
+def _encode(obj):
+    data = json.dumps(obj)
+    if isinstance(data, str):
+        data = data.encode()
+    return data
+
+
+def _parse(data):
+    # (method, path, headers, body) of a complete request, None if partial
+    end = data.find(b'\r\n\r\n')
+    if end < 0:
+        return None
+    lines = data[:end].decode().split('\r\n')
+    method, target = lines[0].split()[:2]
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    body = data[end + 4:]
+    if len(body) < int(headers.get('content-length', 0)):
+        return None
+    return method, target.lstrip('/'), headers, body
+
+
+class Gateway:
+    """Proxy for the boards of a LAN, see the module documentation.
+
+    Everything runs in one loop without threads. Requests other than
+    streams are forwarded upstream one at a time while the loop waits for
+    their response and their body is passed on as is. Other streams than
+    the event stream and game streams, see ``STREAM_PREFIXES``, are refused.
+    A board falling behind by more than ``MAX_PENDING`` bytes of events is
+    disconnected and reconnects by itself.
+
+    Anyone sending one of ``tokens`` acts on the account of the client, so
+    give each board a token of its own.
+
+    :param client: client to send requests upstream with
+    :type client: :class:`~uberserk.clients.Client`
+    :param tokens: tokens boards must send
+    :param str host: address to listen on
+    :param int port: port to listen on
+    """
+
+    def __init__(self, client, tokens, host='0.0.0.0', port=GATEWAY_PORT):
+        self.client = client
+        self.host = host
+        self.port = port
+        self.tokens = set(tokens)
+        self.metrics = client.metrics
+        self.sock = None
+        self.peers = []
+        self.feeds = {}
+
+    def start(self):
+        """Start listening."""
+        ai = socket.getaddrinfo(self.host, self.port)[0]
+        s = socket.socket()
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(ai[-1])
+        s.listen(8)
+        s.setblocking(False)
+        self.sock = s
+
+    def close(self):
+        """Disconnect all boards and stop listening."""
+        for peer in list(self.peers):
+            self._drop(peer)
+        for feed in self.feeds.values():
+            feed.stream.close()
+        self.feeds = {}
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def poll(self):
+        """Accept boards, handle their requests and fan out stream events.
+
+        :return: ``True`` if anything happened
+        :rtype: bool
+        """
+        busy = self._accept()
+        for peer in list(self.peers):
+            busy = self._read(peer) or busy
+        for path in list(self.feeds):
+            busy = self._pump(path) or busy
+        for peer in list(self.peers):
+            busy = self._write(peer) or busy
+        return busy
+
+    def run(self, idle_ms=IDLE_MS):
+        """Serve forever, pausing when there is nothing to do.
+
+        :param int idle_ms: milliseconds to pause when idle
+        """
+        if self.sock is None:
+            self.start()
+        self.client.board.enable_hot_connection()
+        policy = self.client.gc_policy
+        while True:
+            if not self.poll():
+                self.client.board.keep_warm()
+                if policy is not None:
+                    policy.idle()
+                sleep_ms(idle_ms)
+
+    def _accept(self):
+        try:
+            sock, addr = self.sock.accept()
+        except OSError:
+            return False
+        sock.setblocking(False)
+        self.peers.append(_Peer(sock, addr))
+        self.metrics.incr('gateway_connections')
+        return True
+
+    def _read(self, peer):
+        try:
+            data = peer.sock.recv(512)
+        except OSError as e:
+            if e.args[0] == errno.EAGAIN:
+                return False
+            self._drop(peer)
+            return True
+        if not data:
+            self._drop(peer)
+            return True
+        if peer.feed is not None or peer.closing:
+            return True
+        peer.data += data
+        if len(peer.data) > MAX_REQUEST:
+            self._respond(peer, 413, {'error': 'Request too large'})
+            return True
+        try:
+            request = _parse(peer.data)
+        except (ValueError, UnicodeError):
+            self._respond(peer, 400, {'error': 'Malformed request'})
+            return True
+        if request is not None:
+            peer.data = b''
+            self._handle(peer, *request)
+        return True
+
+    def _handle(self, peer, method, path, headers, body):
+        self.metrics.incr('gateway_requests')
+        token = headers.get('authorization', '')[7:]
+        if not token or token not in self.tokens:
+            self._respond(peer, 401, {'error': 'Unauthorized'})
+            return
+        stream_path = path.split('?', 1)[0]
+        if method == 'GET' and (stream_path == EVENTS_PATH or
+                                stream_path.startswith(GAME_STREAM_PREFIX)):
+            self._subscribe(peer, stream_path)
+        elif any(stream_path.startswith(prefix)
+                 for prefix in STREAM_PREFIXES):
+            self.metrics.incr('gateway_refused')
+            self._respond(peer, 501, {'error': 'Stream not proxied'})
+        else:
+            self._forward(peer, method, path, headers, body)
+
+    def _forward(self, peer, method, path, headers, body):
+        # the body is passed on undecoded, only its type is needed
+        stream_path = path.split('?', 1)[0]
+        accept = headers.get('accept', formats.JSON.mime_type)
+        if any(stream_path.startswith(prefix) and stream_path.endswith(suffix)
+               for prefix, suffix in NDJSON_PATHS):
+            content_type = formats.NDJSON.mime_type
+        elif 'pgn' in accept:
+            content_type = formats.PGN.mime_type
+        else:
+            content_type = formats.JSON.mime_type
+        kwargs = {'headers': {'Accept': accept}}
+        if body:
+            kwargs['data'] = body
+            if 'content-type' in headers:
+                kwargs['headers']['Content-Type'] = headers['content-type']
+        if method == 'POST' and any(path.startswith(prefix)
+                                    for prefix in HOT_PREFIXES):
+            kwargs['hot'] = True
+        start = ticks_ms()
+        try:
+            result = self.client._r.request(method, path, fmt=formats.TEXT,
+                                            **kwargs)
+        except exceptions.ResponseError as e:
+            self._respond(peer, e.status_code,
+                          e.cause or {'error': e.message})
+            return
+        except exceptions.ApiError as e:
+            self._respond(peer, 502, {'error': e.message})
+            return
+        except (OSError, ValueError):
+            # body cut off or not even text
+            self._respond(peer, 502, {'error': 'Bad upstream response'})
+            return
+        self.metrics.observe('gateway_forward',
+                             ticks_diff(ticks_ms(), start))
+        self._respond(peer, 200, result.encode(), content_type)
+
+    def _respond(self, peer, status, body, content_type=None):
+        if content_type is None:
+            body = _encode(body)
+            content_type = formats.JSON.mime_type
+        head = 'HTTP/1.0 %d %s\r\nContent-Type: %s\r\n' \
+               'Content-Length: %d\r\nConnection: close\r\n\r\n' % (
+                   status, REASONS.get(status, 'Error'), content_type,
+                   len(body))
+        self._send(peer, head.encode())
+        self._send(peer, body)
+        peer.closing = True
+
+    def _subscribe(self, peer, path):
+        feed = self.feeds.get(path)
+        if feed is None:
+            r = self.client._r
+            if path == EVENTS_PATH:
+                stream = streams.EventStream(r, path)
+            else:
+                game_id = path[len(GAME_STREAM_PREFIX):]
+                stream = streams.GameStream(r, path, game_id=game_id)
+            feed = self.feeds[path] = _Feed(stream)
+        peer.feed = feed
+        feed.peers.append(peer)
+        self._send(peer, b'HTTP/1.0 200 OK\r\n'
+                         b'Content-Type: application/x-ndjson\r\n'
+                         b'Connection: close\r\n\r\n')
+        for event in feed.replay.values():
+            self._send(peer, _encode(event) + b'\n')
+
+    def _pump(self, path):
+        feed = self.feeds[path]
+        if not feed.peers:
+            feed.stream.close()
+            del self.feeds[path]
+            return False
+        try:
+            event = next(feed.stream)
+        except (StopIteration, exceptions.ResponseError):
+            # the game is over or gone, end the streams of the boards
+            for peer in feed.peers:
+                peer.feed = None
+                peer.closing = True
+            del self.feeds[path]
+            return True
+        if event is None:
+            return False
+        if event:
+            feed.remember(event)
+            line = _encode(event) + b'\n'
+            self.metrics.incr('gateway_events')
+        else:
+            line = b'\n'
+        for peer in list(feed.peers):
+            self._send(peer, line)
+            if peer.pending > MAX_PENDING:
+                # only streams can fall behind, responses are sent once
+                self.metrics.incr('gateway_slow_drops')
+                self._drop(peer)
+        return True
+
+    def _send(self, peer, data):
+        peer.out.append(data)
+        peer.pending += len(data)
+
+    def _write(self, peer):
+        busy = False
+        while peer.out:
+            data = peer.out[0]
+            try:
+                n = peer.sock.send(data)
+            except OSError as e:
+                if e.args[0] != errno.EAGAIN:
+                    self._drop(peer)
+                    return True
+                break
+            busy = True
+            peer.pending -= n
+            if n < len(data):
+                peer.out[0] = data[n:]
+                break
+            peer.out.pop(0)
+        if not peer.out and peer.closing:
+            self._drop(peer)
+            return True
+        return busy
+
+    def _drop(self, peer):
+        if peer in self.peers:
+            self.peers.remove(peer)
+        if peer.feed is not None:
+            peer.feed.peers.remove(peer)
+            peer.feed = None
+        peer.sock.close()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+
+import gc
+
+from .metrics import Metrics
+from .utils import ticks_ms, ticks_us, ticks_diff
+
+__all__ = ['GcPolicy']
+
+# Collect once this many bytes were allocated since the last collection...
+ALLOC_THRESHOLD = 16384
+
+# ...or fewer than this many bytes are free...
+MIN_FREE = 8192
+
+# ...or this many milliseconds passed, the only trigger where the heap size is
+# unknown
+MAX_INTERVAL_MS = 5000
+
+_mem_alloc = getattr(gc, 'mem_alloc', None)
+_mem_free = getattr(gc, 'mem_free', None)
+
+
+class GcPolicy:
+    """Collect garbage in the idle gaps of a streaming loop only.
+
+    :meth:`install` turns automatic collection off. The loop then calls
+    :meth:`idle` whenever it has nothing to do, which collects once one of
+    the thresholds is crossed. The streams of a client with the policy do
+    so whenever they have no new event, as do
+    :meth:`~uberserk.sessions.SessionManager.run` and
+    :meth:`~uberserk.gateway.Gateway.run`; any other loop must call it.
+    Between :meth:`hold` and :meth:`release`, such as while a move is sent
+    and its response read, :meth:`idle` does not collect. MicroPython still
+    collects by itself when an allocation fails.
+
+    Each pause is recorded as the ``gc_pause_us`` timer and the time between
+    collections as ``gc_interval_ms``. ``gc_collections`` counts the
+    collections and ``gc_deferred`` the idle gaps skipped because of a hold.
+
+    :param metrics: registry to record to
+    :type metrics: :class:`~uberserk.metrics.Metrics`
+    :param int threshold: bytes allocated since the last collection that
+        make a collection due
+    :param int min_free: free bytes below which a collection is due
+    :param int max_interval: milliseconds after which a collection is due
+    """
+
+    def __init__(self, metrics=None, threshold=ALLOC_THRESHOLD,
+                 min_free=MIN_FREE, max_interval=MAX_INTERVAL_MS):
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.threshold = threshold
+        self.min_free = min_free
+        self.max_interval = max_interval
+        self.held = 0
+        self._last = ticks_ms()
+        self._base = _mem_alloc() if _mem_alloc else 0
+
+    def install(self):
+        """Turn automatic collection off."""
+        gc.disable()
+
+    def uninstall(self):
+        """Turn automatic collection back on."""
+        gc.enable()
+
+    def hold(self):
+        """Keep :meth:`idle` from collecting until :meth:`release`."""
+        self.held += 1
+
+    def release(self):
+        self.held = max(0, self.held - 1)
+
+    def due(self):
+        """Return whether a collection is due.
+
+        :rtype: bool
+        """
+        if ticks_diff(ticks_ms(), self._last) >= self.max_interval:
+            return True
+        if _mem_alloc is None:
+            return False
+        grown = _mem_alloc() - self._base
+        if grown >= self.threshold:
+            return True
+        return grown > 0 and _mem_free is not None and \
+            _mem_free() < self.min_free
+
+    def idle(self):
+        """Collect if a collection is due and nothing holds it off.
+
+        :return: ``True`` if garbage was collected
+        :rtype: bool
+        """
+        if not self.due():
+            return False
+        if self.held:
+            self.metrics.incr('gc_deferred')
+            return False
+        self.collect()
+        return True
+
+    def collect(self):
+        """Collect now and record the pause."""
+        start = ticks_us()
+        gc.collect()
+        self.metrics.observe('gc_pause_us', ticks_diff(ticks_us(), start))
+        now = ticks_ms()
+        self.metrics.observe('gc_interval_ms', ticks_diff(now, self._last))
+        self.metrics.incr('gc_collections')
+        self._last = now
+        self._base = _mem_alloc() if _mem_alloc else 0
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+from .utils import recover_file, replace_file
+
+__all__ = ['MoveJournal']
+
+# File the moves are journaled to
+JOURNAL_PATH = 'moves.log'
+
+# Acknowledgements written at once, an acknowledgement lost in a reset only
+# costs a look at the game stream on replay
+ACK_BATCH = 8
+
+# Size in bytes beyond which the journal is rewritten with pending moves only
+MAX_SIZE = 4096
+
+
+class MoveJournal:
+    """Append-only journal of the moves sent, kept in a file on flash.
+
+    A move is recorded before it is sent and acknowledged once the server
+    answered. Moves left unacknowledged, lost on the network or to a reset,
+    are sent again by :meth:`~uberserk.clients.Board.replay_journal`.
+
+    Recording a move is a single append. Acknowledgements are written in
+    batches of ``ack_batch``, along with the next recorded move if that comes
+    first, and the file is only rewritten once it outgrows ``max_size``. A
+    line torn by a reset while writing is ignored when loading.
+
+    :param str path: file of the journal
+    :param int ack_batch: acknowledgements kept in memory before writing
+    :param int max_size: size in bytes that triggers a rewrite
+    """
+
+    def __init__(self, path=JOURNAL_PATH, ack_batch=ACK_BATCH,
+                 max_size=MAX_SIZE):
+        self.path = path
+        self.ack_batch = ack_batch
+        self.max_size = max_size
+        self.pending = {}
+        self.seq = 0
+        self.size = 0
+        self._acks = []
+        self._load()
+        self._f = open(path, 'ab')
+
+    def record(self, game_id, move, ply=-1):
+        """Record a move about to be sent.
+
+        :param str game_id: ID of the game
+        :param str move: the move
+        :param int ply: number of moves made before it, -1 if unknown
+        :return: sequence number to acknowledge the move with
+        :rtype: int
+        """
+        self.seq += 1
+        self.pending[self.seq] = (game_id, move, ply)
+        line = 'M %d %s %s %d\n' % (self.seq, game_id, move, ply)
+        self._write(self._ack_line() + line)
+        return self.seq
+
+    def ack(self, seq):
+        """Acknowledge a recorded move.
+
+        :param int seq: sequence number returned by :meth:`record`
+        """
+        if self.pending.pop(seq, None) is not None:
+            self._acks.append(seq)
+        if len(self._acks) >= self.ack_batch:
+            self.flush()
+
+    def flush(self):
+        """Write the acknowledgements kept in memory."""
+        if self._acks:
+            self._write(self._ack_line())
+        if self.size > self.max_size:
+            self.compact()
+
+    def compact(self):
+        """Rewrite the journal with the pending moves only."""
+        self._f.close()
+        tmp = self.path + '.tmp'
+        size = 0
+        with open(tmp, 'wb') as f:
+            for seq in sorted(self.pending):
+                game_id, move, ply = self.pending[seq]
+                line = 'M %d %s %s %d\n' % (seq, game_id, move, ply)
+                size += f.write(line.encode())
+        replace_file(tmp, self.path)
+        self.size = size
+        self._f = open(self.path, 'ab')
+
+    def close(self):
+        self.flush()
+        self._f.close()
+
+    def _ack_line(self):
+        if not self._acks:
+            return ''
+        line = 'A %s\n' % ' '.join(str(seq) for seq in self._acks)
+        self._acks = []
+        return line
+
+    def _write(self, data):
+        self.size += self._f.write(data.encode())
+        self._f.flush()
+
+    def _load(self):
+        recover_file(self.path + '.tmp', self.path)
+        try:
+            f = open(self.path, 'rb')
+        except OSError:
+            return
+        with f:
+            for line in f:
+                self.size += len(line)
+                if not line.endswith(b'\n'):
+                    continue  # torn by a reset
+                parts = line.split()
+                try:
+                    if parts[0] == b'M' and len(parts) == 5:
+                        seq = int(parts[1])
+                        self.pending[seq] = (parts[2].decode(),
+                                             parts[3].decode(), int(parts[4]))
+                        self.seq = max(self.seq, seq)
+                    elif parts[0] == b'A':
+                        for seq in parts[1:]:
+                            self.pending.pop(int(seq), None)
+                except (IndexError, ValueError):
+                    continue
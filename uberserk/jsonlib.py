@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+
+"""The fastest JSON backend available, picked at import.
+
+``loads`` accepts ``bytes`` as well as ``str`` with every backend, so lines
+read from the network need not be decoded first. ``BACKEND`` names the
+backend in use.
+"""
+
+__all__ = ['BACKEND', 'loads', 'dumps']
+
+try:
+    import orjson as _json
+    BACKEND = 'orjson'
+except ImportError:
+    try:
+        import ujson as _json
+        BACKEND = 'ujson'
+    except ImportError:
+        import json as _json
+        BACKEND = 'json'
+
+loads = _json.loads
+dumps = _json.dumps
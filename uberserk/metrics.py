@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+__all__ = ['Metrics', 'Timer']
+
+
+class Timer:
+    """Keep running totals and a bounded window of samples of a duration.
+
+    :param int size: number of most recent samples kept for percentiles
+    """
+
+    def __init__(self, size=128):
+        self.size = size
+        self.samples = []
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._pos = 0
+
+    def add(self, value):
+        """Record one sample.
+
+        :param value: the sample, milliseconds by convention
+        """
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+        else:
+            self.samples[self._pos] = value
+            self._pos = (self._pos + 1) % self.size
+
+    def percentile(self, p):
+        """Return a percentile of the recent samples.
+
+        :param p: percentile between 0 and 100
+        :return: the sample at the given percentile or ``None`` if empty
+        """
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * p / 100))
+        return ordered[index]
+
+    def stats(self):
+        """Return a summary of the recorded samples.
+
+        :rtype: dict
+        """
+        return {
+            'count': self.count,
+            'total': self.total,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+class Metrics:
+    """Registry of counters and timers shared by a client."""
+
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+
+    def incr(self, name, value=1):
+        """Increase a counter.
+
+        :param str name: name of the counter
+        :param value: amount to add
+        """
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def timer(self, name):
+        """Return the timer of the given name, creating it if needed.
+
+        :param str name: name of the timer
+        :rtype: :class:`Timer`
+        """
+        timer = self.timers.get(name)
+        if timer is None:
+            timer = self.timers[name] = Timer()
+        return timer
+
+    def observe(self, name, value):
+        """Record a sample of a timer.
+
+        :param str name: name of the timer
+        :param value: the sample, milliseconds by convention
+        """
+        self.timer(name).add(value)
+
+    def snapshot(self):
+        """Return current values of all counters and timers.
+
+        :rtype: dict
+        """
+        result = dict(self.counters)
+        for name in self.timers:
+            result[name] = self.timers[name].stats()
+        return result
@@ -10,6 +10,29 @@ class Model():
             return [cls.convert_one(v) for v in data]
         return cls.convert_one(data)
 
+    @classmethod
+    def converter(cls, fields=None):
+        """Return a function converting data keeping only some fields.
+
+        The data is projected before any conversion so that only the kept
+        fields are converted.
+
+        :param list fields: locations of the fields to keep, see
+            :func:`~uberserk.utils.build_projection`; all if ``None``
+        :return: conversion function
+        :rtype: func
+        """
+        if not fields:
+            return cls.convert
+        project = utils.build_projection(fields)
+
+        def convert(data):
+            if isinstance(data, (list, tuple)):
+                return [cls.convert_one(project(v)) for v in data]
+            return cls.convert_one(project(data))
+
+        return convert
+
     @classmethod
     def convert_one(cls, data):
         for k in set(data) & set(cls.conversions):
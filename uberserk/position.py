@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+
+__all__ = ['PositionTracker', 'START_FEN', 'square', 'square_name']
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+EMPTY = 0
+
+# Castling rights as bits, in FEN order
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+_CASTLING = 'KQkq'
+
+
+def square(name):
+    """Return the index (a1 = 0, h8 = 63) of a square name such as ``e4``.
+
+    :param str name: the square name
+    :rtype: int
+    """
+    file = ord(name[0]) - 97
+    rank = ord(name[1]) - 49
+    if not (0 <= file < 8 and 0 <= rank < 8) or len(name) != 2:
+        raise ValueError('Invalid square: %s' % name)
+    return rank * 8 + file
+
+
+def square_name(index):
+    """Return the name of a square index.
+
+    :param int index: index of the square, a1 = 0, h8 = 63
+    :rtype: str
+    """
+    return chr(97 + index % 8) + chr(49 + index // 8)
+
+
+def _is_white(piece):
+    return 65 <= piece <= 90
+
+
+# Steps as (file, rank) deltas
+_KNIGHT_STEPS = ((1, 2), (2, 1), (2, -1), (1, -2),
+                 (-1, -2), (-2, -1), (-2, 1), (-1, 2))
+_KING_STEPS = ((0, 1), (1, 1), (1, 0), (1, -1),
+               (0, -1), (-1, -1), (-1, 0), (-1, 1))
+_ROOK_STEPS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+_BISHOP_STEPS = ((1, 1), (1, -1), (-1, -1), (-1, 1))
+
+# Knight and king attacks of each square, built on first use
+_tables = {}
+
+
+def _attack_table(steps):
+    table = _tables.get(steps)
+    if table is None:
+        table = []
+        for index in range(64):
+            file, rank = index % 8, index // 8
+            table.append(bytes((rank + dr) * 8 + file + df for df, dr in steps
+                               if 0 <= file + df < 8 and 0 <= rank + dr < 8))
+        table = _tables[steps] = tuple(table)
+    return table
+
+
+class PositionTracker:
+    """Chess position updated incrementally with UCI moves.
+
+    Pieces are kept as FEN letters in a 64 byte array, together with the
+    side to move, castling rights, the en passant square and the move
+    counters. Both standard and Chess960 castling moves are understood.
+
+    :param str fen: the starting position, e.g. one of
+        :class:`~uberserk.enums.Position`
+    """
+
+    def __init__(self, fen=START_FEN):
+        self.board = bytearray(64)
+        self.changed = []
+        self.set_fen(fen)
+
+    def set_fen(self, fen):
+        """Set up the position from a FEN string.
+
+        :param str fen: position in FEN, ``startpos`` for the initial one
+        """
+        if fen == 'startpos':
+            fen = START_FEN
+        fields = fen.split()
+        board = self.board
+        for i in range(64):
+            board[i] = EMPTY
+        rank, file = 7, 0
+        for c in fields[0]:
+            if c == '/':
+                rank, file = rank - 1, 0
+            elif '1' <= c <= '8':
+                file += ord(c) - 48
+            else:
+                board[rank * 8 + file] = ord(c)
+                file += 1
+        self.white = len(fields) < 2 or fields[1] == 'w'
+        self._set_castling(fields[2] if len(fields) > 2 else '-')
+        ep = fields[3] if len(fields) > 3 else '-'
+        self.ep = None if ep == '-' else square(ep)
+        self.halfmove = int(fields[4]) if len(fields) > 4 else 0
+        self.fullmove = int(fields[5]) if len(fields) > 5 else 1
+        self.changed = list(range(64))
+
+    def _set_castling(self, field):
+        # rook square of each right, outermost rooks unless Shredder-FEN
+        # names their files
+        self.castling = 0
+        self.rooks = {WHITE_KINGSIDE: 7, WHITE_QUEENSIDE: 0,
+                      BLACK_KINGSIDE: 63, BLACK_QUEENSIDE: 56}
+        for c in field:
+            if c in _CASTLING:
+                self.castling |= 1 << _CASTLING.index(c)
+            elif c != '-':
+                white = c.isupper()
+                rook = (0 if white else 56) + ord(c.lower()) - 97
+                king = self.king(white)
+                if rook > king:
+                    right = WHITE_KINGSIDE if white else BLACK_KINGSIDE
+                else:
+                    right = WHITE_QUEENSIDE if white else BLACK_QUEENSIDE
+                self.castling |= right
+                self.rooks[right] = rook
+
+    def king(self, white):
+        """Return the square of the king of a side.
+
+        :param bool white: ``True`` for white
+        :rtype: int
+        """
+        piece = 75 if white else 107
+        board = self.board
+        for index in range(64):
+            if board[index] == piece:
+                return index
+        return -1
+
+    def piece_at(self, index):
+        """Return the FEN letter of the piece on a square or ``None``.
+
+        :param int index: index of the square
+        :rtype: str
+        """
+        piece = self.board[index]
+        return chr(piece) if piece else None
+
+    def placement(self):
+        """Return the piece placement field of the FEN.
+
+        :rtype: str
+        """
+        ranks = []
+        board = self.board
+        for rank in range(7, -1, -1):
+            row = ''
+            empty = 0
+            for index in range(rank * 8, rank * 8 + 8):
+                piece = board[index]
+                if piece:
+                    if empty:
+                        row += str(empty)
+                        empty = 0
+                    row += chr(piece)
+                else:
+                    empty += 1
+            if empty:
+                row += str(empty)
+            ranks.append(row)
+        return '/'.join(ranks)
+
+    def fen(self):
+        """Return the position in FEN.
+
+        :rtype: str
+        """
+        castling = ''.join(c for i, c in enumerate(_CASTLING)
+                           if self.castling & (1 << i)) or '-'
+        ep = '-' if self.ep is None else square_name(self.ep)
+        return '%s %s %s %s %d %d' % (self.placement(),
+                                      'w' if self.white else 'b', castling,
+                                      ep, self.halfmove, self.fullmove)
+
+    def push(self, move):
+        """Make a move.
+
+        :param str move: the move in UCI, e.g. ``e2e4`` or ``e7e8q``
+        :return: indices of the squares whose piece changed
+        :rtype: list
+        """
+        board = self.board
+        frm, to = square(move[0:2]), square(move[2:4])
+        piece = board[frm]
+        if not piece:
+            raise ValueError('No piece on %s' % move[0:2])
+        white = _is_white(piece)
+        kind = piece | 32  # lower case
+        target = board[to]
+        changed = [frm, to]
+        ep = None
+
+        if kind == 107 and (abs(to - frm) == 2 or (
+                target and _is_white(target) == white and target | 32 == 114)):
+            return self._castle(frm, to, white)
+
+        if kind == 112:  # pawn
+            if to == self.ep and not target:
+                captured = to - 8 if white else to + 8
+                board[captured] = EMPTY
+                changed.append(captured)
+            elif abs(to - frm) == 16:
+                ep = (frm + to) // 2
+            if len(move) > 4:
+                piece = ord(move[4].upper() if white else move[4].lower())
+        board[to] = piece
+        board[frm] = EMPTY
+
+        if kind == 107:
+            self.castling &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE if white
+                               else BLACK_KINGSIDE | BLACK_QUEENSIDE)
+        for right in self.rooks:
+            if self.rooks[right] in (frm, to):
+                self.castling &= ~right
+        self.halfmove = 0 if kind == 112 or target else self.halfmove + 1
+        self._finish(ep)
+        self.changed = changed
+        return changed
+
+    def attacked(self, index, by_white):
+        """Tell whether a side attacks a square.
+
+        :param int index: index of the square
+        :param bool by_white: ``True`` for attacks of white pieces
+        :rtype: bool
+        """
+        board = self.board
+        case = 0 if by_white else 32
+        for other in _attack_table(_KNIGHT_STEPS)[index]:
+            if board[other] == 78 | case:
+                return True
+        for other in _attack_table(_KING_STEPS)[index]:
+            if board[other] == 75 | case:
+                return True
+        file, rank = index % 8, index // 8
+        pawn_rank = rank - 1 if by_white else rank + 1
+        if 0 <= pawn_rank < 8:
+            for pawn_file in (file - 1, file + 1):
+                if 0 <= pawn_file < 8 and \
+                        board[pawn_rank * 8 + pawn_file] == 80 | case:
+                    return True
+        for steps, sliders in ((_ROOK_STEPS, (82 | case, 81 | case)),
+                               (_BISHOP_STEPS, (66 | case, 81 | case))):
+            for df, dr in steps:
+                f, r = file + df, rank + dr
+                while 0 <= f < 8 and 0 <= r < 8:
+                    piece = board[r * 8 + f]
+                    if piece:
+                        if piece in sliders:
+                            return True
+                        break
+                    f, r = f + df, r + dr
+        return False
+
+    def is_legal(self, move):
+        """Tell whether a UCI move is legal in the position.
+
+        :param str move: the move in UCI, e.g. ``e2e4`` or ``e7e8q``
+        :rtype: bool
+        """
+        try:
+            frm, to = square(move[0:2]), square(move[2:4])
+        except (ValueError, IndexError):
+            return False
+        board = self.board
+        piece = board[frm]
+        if not piece or _is_white(piece) != self.white or frm == to:
+            return False
+        white = self.white
+        kind = piece | 32
+        target = board[to]
+        promotion = move[4:]
+        last_rank = to // 8 == (7 if white else 0)
+        if promotion and (kind != 112 or not last_rank or
+                          len(promotion) > 1 or promotion not in 'qrbn'):
+            return False
+
+        if kind == 107 and (abs(to - frm) == 2 or (
+                target and _is_white(target) == white and target | 32 == 114)):
+            return self._can_castle(frm, to, white)
+        if target and _is_white(target) == white:
+            return False
+
+        df, dr = to % 8 - frm % 8, to // 8 - frm // 8
+        if kind == 112:
+            forward = 1 if white else -1
+            if last_rank and not promotion:
+                return False
+            if df == 0:
+                if target:
+                    return False
+                start = 1 if white else 6
+                if dr != forward and not (
+                        dr == 2 * forward and frm // 8 == start and
+                        not board[frm + 8 * forward]):
+                    return False
+            elif not (abs(df) == 1 and dr == forward and
+                      (target or to == self.ep)):
+                return False
+        elif kind == 110:
+            if to not in _attack_table(_KNIGHT_STEPS)[frm]:
+                return False
+        elif kind == 107:
+            if to not in _attack_table(_KING_STEPS)[frm]:
+                return False
+        elif not self._slides(frm, df, dr, kind):
+            return False
+
+        after = self.copy()
+        after.push(move)
+        return not after.attacked(after.king(white), not white)
+
+    def _slides(self, frm, df, dr, kind):
+        straight = df == 0 or dr == 0
+        diagonal = abs(df) == abs(dr)
+        if not (straight and kind in (114, 113) or
+                diagonal and kind in (98, 113)):
+            return False
+        step = (dr > 0) - (dr < 0), (df > 0) - (df < 0)
+        index = frm + step[0] * 8 + step[1]
+        for _ in range(max(abs(df), abs(dr)) - 1):
+            if self.board[index]:
+                return False
+            index += step[0] * 8 + step[1]
+        return True
+
+    def _can_castle(self, frm, to, white):
+        board = self.board
+        back = 0 if white else 56
+        kingside = to > frm
+        if white:
+            right = WHITE_KINGSIDE if kingside else WHITE_QUEENSIDE
+        else:
+            right = BLACK_KINGSIDE if kingside else BLACK_QUEENSIDE
+        rook = self.rooks[right]
+        if not self.castling & right or frm // 8 != back // 8 or \
+                (board[to] and to != rook):
+            return False
+        king_to = back + (6 if kingside else 2)
+        rook_to = back + (5 if kingside else 3)
+        low = min(frm, rook, king_to, rook_to)
+        high = max(frm, rook, king_to, rook_to)
+        for index in range(low, high + 1):
+            if board[index] and index not in (frm, rook):
+                return False
+        step = 1 if king_to >= frm else -1
+        for index in range(frm, king_to + step, step):
+            if self.attacked(index, not white):
+                return False
+        return True
+
+    def copy(self):
+        """Return an independent copy of the position.
+
+        :rtype: :class:`PositionTracker`
+        """
+        other = PositionTracker.__new__(PositionTracker)
+        other.board = bytearray(self.board)
+        other.changed = []
+        other.white = self.white
+        other.castling = self.castling
+        other.rooks = dict(self.rooks)
+        other.ep = self.ep
+        other.halfmove = self.halfmove
+        other.fullmove = self.fullmove
+        return other
+
+    def _castle(self, frm, to, white):
+        board = self.board
+        back = 0 if white else 56
+        kingside = to > frm
+        if board[to]:
+            rook = to  # Chess960 notation, king takes own rook
+        elif white:
+            rook = self.rooks[WHITE_KINGSIDE if kingside else WHITE_QUEENSIDE]
+        else:
+            rook = self.rooks[BLACK_KINGSIDE if kingside else BLACK_QUEENSIDE]
+        king_to = back + (6 if kingside else 2)
+        rook_to = back + (5 if kingside else 3)
+        king, rook_piece = board[frm], board[rook]
+        board[frm] = board[rook] = EMPTY
+        board[king_to] = king
+        board[rook_to] = rook_piece
+        self.castling &= ~(WHITE_KINGSIDE | WHITE_QUEENSIDE if white
+                           else BLACK_KINGSIDE | BLACK_QUEENSIDE)
+        self.halfmove += 1
+        self._finish(None)
+        changed = []
+        for index in (frm, rook, king_to, rook_to):
+            if index not in changed:
+                changed.append(index)
+        self.changed = changed
+        return changed
+
+    def _finish(self, ep):
+        self.ep = ep
+        if not self.white:
+            self.fullmove += 1
+        self.white = not self.white
+
+    def apply(self, moves):
+        """Make several moves.
+
+        :param list moves: moves in UCI
+        :return: indices of the squares whose piece changed
+        :rtype: list
+        """
+        changed = []
+        for move in moves:
+            for index in self.push(move):
+                if index not in changed:
+                    changed.append(index)
+        self.changed = changed
+        return changed
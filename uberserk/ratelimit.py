@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+from .utils import ticks_ms, ticks_diff, ticks_add, sleep_ms
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+__all__ = ['TokenBucket', 'RateLimiter', 'for_token']
+
+# Minimum pause after the server answers with HTTP 429, see
+# https://lichess.org/page/api-tips
+PENALTY_MS = 60000
+
+# Endpoint classes as (path prefix, class name), first match wins
+ENDPOINT_CLASSES = (
+    ('api/board/game/stream/', 'stream'),
+    ('api/stream/', 'stream'),
+    ('api/board/', 'board'),
+    ('api/challenge/', 'board'),
+    ('api/users', 'bulk'),
+    ('api/games/', 'bulk'),
+)
+
+# Requests per second and burst size for each endpoint class, None for no
+# pacing. Streams are not paced: each game has a stream of its own and
+# reconnects of a stream already back off, see uberserk.streams
+DEFAULT_RATES = {
+    'board': (4, 8),
+    'stream': None,
+    'bulk': (0.5, 2),
+    'default': (1, 4),
+}
+
+
+class TokenBucket:
+    """Token bucket refilled at a constant rate.
+
+    :param rate: tokens added per second
+    :param int capacity: maximum number of tokens (burst size)
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = ticks_ms()
+
+    def _refill(self, now):
+        elapsed = ticks_diff(now, self.updated)
+        if elapsed > 0:
+            self.tokens = min(self.capacity,
+                              self.tokens + elapsed * self.rate / 1000)
+            self.updated = now
+
+    def delay(self, now):
+        """Return milliseconds until a token is available.
+
+        :param int now: current ticks in milliseconds
+        :rtype: int
+        """
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0
+        return int((1 - self.tokens) * 1000 / self.rate) + 1
+
+    def take(self):
+        self.tokens -= 1
+
+
+class RateLimiter:
+    """Pace requests of one token to stay within the API rate limits.
+
+    Each endpoint class has its own token bucket, unless its rate is
+    ``None``. A 429 response pauses all requests for at least the server's
+    penalty window.
+
+    :param dict rates: ``(per second, burst)`` for each endpoint class
+    :param int penalty: minimum pause after a 429 in milliseconds
+    """
+
+    def __init__(self, rates=None, penalty=PENALTY_MS):
+        self.rates = dict(DEFAULT_RATES)
+        self.rates.update(rates or {})
+        self.penalty = penalty
+        self.buckets = {}
+        self.paused_until = None
+        self._lock = _thread.allocate_lock() if _thread else None
+
+    @staticmethod
+    def classify(path):
+        """Return the endpoint class of an URL path.
+
+        :param str path: the URL suffix
+        :rtype: str
+        """
+        path = path.lstrip('/')
+        for prefix, name in ENDPOINT_CLASSES:
+            if path.startswith(prefix):
+                return name
+        return 'default'
+
+    def _bucket(self, name):
+        # None for an endpoint class that is not paced
+        bucket = self.buckets.get(name)
+        if bucket is None:
+            rate = self.rates.get(name, self.rates['default'])
+            if rate is None:
+                return None
+            bucket = self.buckets[name] = TokenBucket(*rate)
+        return bucket
+
+    def delay(self, path):
+        """Return milliseconds until a request to path may be sent.
+
+        :param str path: the URL suffix
+        :rtype: int
+        """
+        now = ticks_ms()
+        bucket = self._bucket(self.classify(path))
+        wait = bucket.delay(now) if bucket is not None else 0
+        if self.paused_until is not None:
+            paused = ticks_diff(self.paused_until, now)
+            if paused > 0:
+                return max(wait, paused)
+            self.paused_until = None
+        return wait
+
+    def acquire(self, path, metrics=None):
+        """Wait until a request to path may be sent and take its token.
+
+        :param str path: the URL suffix
+        :param metrics: registry to record the time spent throttled in
+        :type metrics: :class:`~uberserk.metrics.Metrics`
+        """
+        while True:
+            # the lock is only held to check and take, never while sleeping,
+            # so other threads are not kept from their own buckets
+            if self._lock:
+                self._lock.acquire()
+            try:
+                wait = self.delay(path)
+                if not wait:
+                    bucket = self._bucket(self.classify(path))
+                    if bucket is not None:
+                        bucket.take()
+                    return
+            finally:
+                if self._lock:
+                    self._lock.release()
+            if metrics is not None:
+                metrics.incr('throttled_ms', wait)
+            sleep_ms(wait)
+
+    def penalize(self, retry_after=None, metrics=None):
+        """Pause all requests after the server answered with HTTP 429.
+
+        :param int retry_after: pause requested by the server in seconds
+        :param metrics: registry to count the penalty in
+        :type metrics: :class:`~uberserk.metrics.Metrics`
+        """
+        pause = max(self.penalty, (retry_after or 0) * 1000)
+        self.paused_until = ticks_add(ticks_ms(), pause)
+        if metrics is not None:
+            metrics.incr('rate_limited')
+
+
+_limiters = {}
+
+
+def for_token(auth_token):
+    """Return the rate limiter shared by all requests with a token.
+
+    :param str auth_token: the API token
+    :rtype: :class:`RateLimiter`
+    """
+    limiter = _limiters.get(auth_token)
+    if limiter is None:
+        limiter = _limiters[auth_token] = RateLimiter()
+    return limiter
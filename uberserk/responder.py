@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+from . import exceptions
+from .enums import DeclineReason
+from .utils import ticks_ms, ticks_us, ticks_diff
+
+__all__ = ['ChallengePolicy', 'ChallengeResponder']
+
+# Speeds from the fastest to the slowest
+SPEEDS = ('ultraBullet', 'bullet', 'blitz', 'rapid', 'classical',
+          'correspondence')
+
+
+class ChallengePolicy:
+    """Local rules deciding which challenges to accept.
+
+    Rules left at ``None`` accept anything.
+
+    :param variants: keys of the accepted variants
+    :param speeds: accepted speeds, see :data:`SPEEDS`
+    :param bool rated: accept only rated (``True``) or only casual
+        (``False``) challenges
+    :param int min_rating: lowest accepted rating of the challenger
+    :param int max_rating: highest accepted rating of the challenger
+    :param allow: IDs of the only users whose challenges are accepted
+    :param int max_games: number of games played at once
+    """
+
+    def __init__(self, variants=None, speeds=None, rated=None,
+                 min_rating=None, max_rating=None, allow=None,
+                 max_games=None):
+        self.variants = variants
+        self.speeds = speeds
+        self.rated = rated
+        self.min_rating = min_rating
+        self.max_rating = max_rating
+        self.allow = None
+        if allow is not None:
+            self.allow = set(user.lower() for user in allow)
+        self.max_games = max_games
+
+    def decide(self, challenge, games=0):
+        """Decide on a challenge.
+
+        :param dict challenge: the challenge of a ``challenge`` event
+        :param int games: number of games being played
+        :return: ``None`` to accept, otherwise the reason to decline with
+        :rtype: str
+        """
+        challenger = challenge.get('challenger') or {}
+        if self.allow is not None and \
+                (challenger.get('id') or '').lower() not in self.allow:
+            return DeclineReason.GENERIC
+        if self.max_games is not None and games >= self.max_games:
+            return DeclineReason.LATER
+        variant = (challenge.get('variant') or {}).get('key')
+        if self.variants is not None and variant not in self.variants:
+            if list(self.variants) == ['standard']:
+                return DeclineReason.STANDARD
+            return DeclineReason.VARIANT
+        speed = challenge.get('speed')
+        if self.speeds is not None and speed not in self.speeds:
+            return self._speed_reason(speed)
+        rated = challenge.get('rated')
+        if self.rated is not None and bool(rated) != self.rated:
+            return DeclineReason.RATED if self.rated else DeclineReason.CASUAL
+        rating = challenger.get('rating')
+        if rating is not None and (
+                self.min_rating is not None and rating < self.min_rating or
+                self.max_rating is not None and rating > self.max_rating):
+            return DeclineReason.GENERIC
+        return None
+
+    def _speed_reason(self, speed):
+        known = [SPEEDS.index(s) for s in self.speeds if s in SPEEDS]
+        if speed not in SPEEDS or not known:
+            return DeclineReason.TIME_CONTROL
+        index = SPEEDS.index(speed)
+        if index < min(known):
+            return DeclineReason.TOO_FAST
+        if index > max(known):
+            return DeclineReason.TOO_SLOW
+        return DeclineReason.TIME_CONTROL
+
+
+class ChallengeResponder:
+    """Accept or decline incoming challenges as soon as they arrive.
+
+    Hand every incoming event to :meth:`handle`, e.g. as the ``on_event`` of
+    a :class:`~uberserk.sessions.SessionManager`. Challenges are decided by
+    the policy and answered right away, over the hot connection if the
+    board has one.
+
+    The time to decide is recorded as the ``challenge_decide_us`` timer and
+    the round trip of the answer as ``challenge_accept`` or
+    ``challenge_decline``, both in the client metrics, next to the
+    ``challenges_accepted`` and ``challenges_declined`` counters.
+
+    :param client: client to answer with
+    :type client: :class:`~uberserk.clients.Client`
+    :param policy: the rules
+    :type policy: :class:`ChallengePolicy`
+    :param str user_id: ID of the account, challenges to others are ignored
+    :param func games: returns the number of games being played, by default
+        counted from the ``gameStart`` and ``gameFinish`` events handled
+    :param func on_decision: called with the challenge and the reason, or
+        ``None`` if accepted, after answering
+    :param func join: called with the challenge ID and the challenger to
+        accept instead of :meth:`~uberserk.clients.Challenges.accept`, such
+        as :meth:`~uberserk.sessions.SessionManager.accept_and_join`;
+        returns ``None`` if the challenge was not accepted
+    """
+
+    def __init__(self, client, policy, user_id=None, games=None,
+                 on_decision=None, join=None):
+        self.client = client
+        self.policy = policy
+        self.user_id = user_id.lower() if user_id else None
+        self.games = games or self._count_games
+        self.on_decision = on_decision
+        self.join = join
+        self.playing = set()
+
+    def handle(self, event):
+        """Handle an incoming event.
+
+        :param dict event: a parsed incoming event
+        :return: ``True`` if a challenge was accepted
+        :rtype: bool
+        """
+        kind = event.get('type')
+        if kind == 'challenge':
+            return self.respond(event['challenge'])
+        game = event.get('game') or {}
+        game_id = game.get('gameId') or game.get('id')
+        if kind == 'gameStart':
+            self.playing.add(game_id)
+        elif kind == 'gameFinish':
+            self.playing.discard(game_id)
+        return False
+
+    def respond(self, challenge):
+        """Decide on a challenge and answer it.
+
+        :param dict challenge: the challenge of a ``challenge`` event
+        :return: ``True`` if it was accepted
+        :rtype: bool
+        """
+        dest = (challenge.get('destUser') or {}).get('id')
+        if self.user_id is not None and (dest or '').lower() != self.user_id:
+            return False
+        metrics = self.client.metrics
+        start = ticks_us()
+        reason = self.policy.decide(challenge, self.games())
+        metrics.observe('challenge_decide_us', ticks_diff(ticks_us(), start))
+        start = ticks_ms()
+        try:
+            if reason is None and self.join is not None:
+                challenger = challenge.get('challenger') or {}
+                answered = self.join(challenge['id'],
+                                     challenger.get('name')) is not None
+            elif reason is None:
+                answered = self.client.challenges.accept(challenge['id'])
+            else:
+                answered = self.client.challenges.decline(challenge['id'],
+                                                          reason)
+        except exceptions.ApiError:
+            answered = False
+        if not answered:
+            # withdrawn or expired meanwhile, or the answer was lost
+            metrics.incr('challenges_missed')
+            return False
+        name = 'challenge_accept' if reason is None else 'challenge_decline'
+        metrics.observe(name, ticks_diff(ticks_ms(), start))
+        if reason is None:
+            metrics.incr('challenges_accepted')
+            self.playing.add(challenge['id'])
+        else:
+            metrics.incr('challenges_declined')
+        if self.on_decision is not None:
+            self.on_decision(challenge, reason)
+        return reason is None
+
+    def _count_games(self):
+        return len(self.playing)
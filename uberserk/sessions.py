@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+
+import gc
+
+from . import exceptions
+from .utils import fan_out, sleep_ms, ticks_add, ticks_diff, ticks_ms, ticks_us
+
+__all__ = ['GameSession', 'SessionManager']
+
+# Pause of the loop when no stream had anything to do
+IDLE_MS = 20
+
+_mem_alloc = getattr(gc, 'mem_alloc', None)
+
+
+class GameSession:
+    """One game run by a :class:`SessionManager`.
+
+    Subclass and override the ``on_*`` callbacks, each receives the parsed
+    event of its type.
+
+    :param manager: manager running the game
+    :type manager: :class:`SessionManager`
+    :param str game_id: ID of the game
+    :param dict game: the game from the ``gameStart`` event, if any
+    """
+
+    def __init__(self, manager, game_id, game=None):
+        self.manager = manager
+        self.game_id = game_id
+        self.game = game
+        self.stream = None
+        self.opponent = None
+        self.requested = None
+        self.stats = {'polls': 0, 'events': 0, 'cpu_us': 0, 'alloc': 0}
+
+    def on_full(self, event):
+        """Called with the ``gameFull`` event opening the game."""
+
+    def on_state(self, state):
+        """Called with every new ``gameState`` event."""
+
+    def on_chat(self, event):
+        """Called with every ``chatLine`` event."""
+
+    def on_opponent_gone(self, event):
+        """Called with every ``opponentGone`` event."""
+
+    def on_finish(self):
+        """Called once the game is over and its stream closed."""
+
+    def make_move(self, move):
+        """Make a move in this game.
+
+        :param str move: move to make
+        :return: success
+        :rtype: bool
+        """
+        return self.manager.client.board.make_move(self.game_id, move)
+
+    def dispatch(self, event):
+        """Hand an event to the callback of its type.
+
+        :param dict event: a parsed game event
+        """
+        kind = event.get('type')
+        if kind == 'gameFull':
+            self.on_full(event)
+        elif kind == 'gameState':
+            self.on_state(event)
+        elif kind == 'chatLine':
+            self.on_chat(event)
+        elif kind == 'opponentGone':
+            self.on_opponent_gone(event)
+
+
+class SessionManager:
+    """Run the game streams of all ongoing games in a single loop.
+
+    Game streams are opened on ``gameStart`` and closed on ``gameFinish``
+    events of the incoming event stream. Each call to :meth:`poll` reads
+    every stream once without blocking, so hundreds of games share one
+    thread. CPU time and memory allocated while handling each game are kept
+    in :attr:`GameSession.stats`.
+
+    :param client: client to stream with
+    :type client: :class:`~uberserk.clients.Client`
+    :param session_factory: callable returning a :class:`GameSession` for
+        ``(manager, game_id, game)``
+    :param func on_event: called with every incoming event, such as
+        challenges, after the manager handled it; without it only game
+        events are decoded
+    """
+
+    def __init__(self, client, session_factory=GameSession, on_event=None):
+        self.client = client
+        self.session_factory = session_factory
+        self.on_event = on_event
+        self.sessions = {}
+        types = None if on_event else ('gameStart', 'gameFinish')
+        self.events = client.board.stream_incoming_events(types=types)
+
+    def open(self, game_id, game=None):
+        """Start streaming a game.
+
+        :param str game_id: ID of the game
+        :param dict game: the game from the ``gameStart`` event, if any
+        :return: the session of the game
+        :rtype: :class:`GameSession`
+        """
+        session = self.sessions.get(game_id)
+        if session is None:
+            session = self.session_factory(self, game_id, game)
+            session.stream = self.client.board.stream_game_state(game_id)
+            self.sessions[game_id] = session
+        elif session.game is None:
+            # opened by accept_and_join before its gameStart
+            session.game = game
+        return session
+
+    def accept_and_join(self, challenge_id, opponent=None, timeout=None):
+        """Accept a challenge and get its game ready to play.
+
+        The game of a challenge has the ID of the challenge, so its stream is
+        opened right after accepting, without waiting for ``gameStart``.
+        Meanwhile the public data of the opponent is fetched into
+        :attr:`GameSession.opponent`, in parallel where ``_thread`` is
+        available. Both run in threads then, which on the ESP32 need a
+        ``_thread.stack_size`` large enough for TLS, e.g. 16 KiB.
+
+        The ``gameFull`` event is handed to :meth:`GameSession.on_full` by
+        :meth:`poll` like any other event, unless it came with the opening of
+        the stream. With a ``timeout`` it is awaited for up to that many
+        milliseconds before returning, while the other games wait, so leave
+        it out when called from the loop, e.g. by a
+        :class:`~uberserk.responder.ChallengeResponder`.
+
+        The time from the call to the first position is recorded as the
+        ``first_position`` timer of the client metrics.
+
+        :param str challenge_id: ID of the challenge
+        :param str opponent: username of the challenger
+        :param int timeout: milliseconds to wait for the first position, not
+            waited for if ``None``
+        :return: the session of the game, ``None`` if not accepted
+        :rtype: :class:`GameSession`
+        """
+        start = ticks_ms()
+
+        def join():
+            if not self.client.challenges.accept(challenge_id):
+                return None, None
+            session = self.open(challenge_id)
+            session.requested = start
+            return session, next(session.stream)  # connects right away
+
+        def prefetch():
+            try:
+                return self.client.users.get_public_data(opponent)
+            except Exception:
+                return None
+
+        tasks = [join, prefetch] if opponent else [join]
+        results = list(fan_out(lambda task: task(), tasks, len(tasks)))
+        session, event = results[0]
+        if session is None:
+            return None
+        if opponent:
+            session.opponent = results[1]
+        if event:
+            self._dispatch(session, event)
+        if timeout is None:
+            return session
+        deadline = ticks_add(start, timeout)
+        while session.requested is not None and \
+                challenge_id in self.sessions and \
+                ticks_diff(deadline, ticks_ms()) > 0:
+            if not self._poll_game(session):
+                sleep_ms(IDLE_MS)
+        return session
+
+    def close(self, game_id):
+        """Stop streaming a game.
+
+        :param str game_id: ID of the game
+        """
+        session = self.sessions.pop(game_id, None)
+        if session is not None:
+            session.stream.close()
+            session.on_finish()
+
+    def poll(self):
+        """Read the event stream and every game stream once.
+
+        :return: ``True`` if any event was handled
+        :rtype: bool
+        """
+        busy = self._poll_events()
+        for game_id in list(self.sessions):
+            busy = self._poll_game(self.sessions[game_id]) or busy
+        return busy
+
+    def run(self, idle_ms=IDLE_MS):
+        """Poll forever, pausing when there is nothing to do.
+
+        Garbage is collected in these pauses if the client has a GC policy,
+        see :class:`~uberserk.gcpolicy.GcPolicy`.
+
+        :param int idle_ms: milliseconds to pause when all streams are idle
+        """
+        policy = getattr(self.client, 'gc_policy', None)
+        while True:
+            if not self.poll():
+                self.client.board.keep_warm()
+                if policy is not None:
+                    policy.idle()
+                sleep_ms(idle_ms)
+
+    def report(self):
+        """Return the cost of each game.
+
+        ``alloc`` is only known on MicroPython and stays 0 elsewhere.
+
+        :return: stats of each session by game ID
+        :rtype: dict
+        """
+        return {game_id: dict(self.sessions[game_id].stats)
+                for game_id in self.sessions}
+
+    def _poll_events(self):
+        event = next(self.events)
+        if not event:
+            return False
+        kind = event.get('type')
+        game = event.get('game') or {}
+        game_id = game.get('gameId') or game.get('id')
+        if kind == 'gameStart':
+            self.open(game_id, game)
+        elif kind == 'gameFinish':
+            self.close(game_id)
+        if self.on_event is not None:
+            self.on_event(event)
+        return True
+
+    def _poll_game(self, session):
+        stats = session.stats
+        start = ticks_us()
+        alloc = _mem_alloc() if _mem_alloc else 0
+        try:
+            event = next(session.stream)
+        except (StopIteration, exceptions.ResponseError):
+            # over, or gone for good (4xx), leave the other games running
+            self.close(session.game_id)
+            return True
+        if event:
+            self._dispatch(session, event)
+        stats['polls'] += 1
+        stats['cpu_us'] += ticks_diff(ticks_us(), start)
+        if _mem_alloc:
+            stats['alloc'] += max(0, _mem_alloc() - alloc)
+        return bool(event)
+
+    def _dispatch(self, session, event):
+        session.stats['events'] += 1
+        if session.requested is not None and event.get('type') == 'gameFull':
+            self.client.metrics.observe(
+                'first_position', ticks_diff(ticks_ms(), session.requested))
+            session.requested = None
+        session.dispatch(event)
@@ -0,0 +1,500 @@
+# -*- coding: utf-8 -*-
+
+import random
+
+from . import exceptions
+from . import openings
+from .position import PositionTracker
+from .utils import noop, ticks_ms, ticks_diff, ticks_add
+
+__all__ = ['Stream', 'EventStream', 'GameStream', 'MoveTracker', 'Broadcast',
+           'Subscription']
+
+# Lichess sends a blank keep-alive line every few seconds, a stream silent
+# for longer than this is considered dead
+STALE_MS = 20000
+
+# First and maximum delay between reconnect attempts
+BACKOFF_MS = 500
+MAX_BACKOFF_MS = 30000
+
+# Game statuses for which the game stream is still live
+LIVE_STATUSES = ('created', 'started')
+
+# Fields telling apart game states, clocks alone do not make a new state
+STATE_KEYS = ('moves', 'status', 'winner', 'wdraw', 'bdraw', 'wtakeback',
+              'btakeback')
+
+# What a broadcast does with an event for a subscriber whose queue is full:
+# drop the event, drop the oldest queued event, or stop reading the source
+DROP = 'drop'
+LATEST = 'latest'
+BLOCK = 'block'
+
+
+class Stream:
+    """Resilient, non-blocking stream of events.
+
+    Iterating yields the next event, or a falsy value (``None`` or a
+    keep-alive ``{}``) when there is none yet. A stream that ends or stays
+    silent for longer than ``timeout`` is reopened in the background with a
+    jittered exponential backoff. Subclasses drop events already seen before
+    a reconnect in :meth:`accept`.
+
+    Whenever ``None`` is yielded, the :class:`~uberserk.gcpolicy.GcPolicy`
+    of the client, if any, gets to collect garbage.
+
+    A line longer than the ``max_body`` of the client ends the stream for
+    good, as the server would send it again after a reconnect. It is counted
+    as ``stream_too_large``.
+
+    :param requestor: requestor to open the stream with
+    :type requestor: :class:`~uberserk.clients.Requestor`
+    :param str path: the URL suffix of the stream
+    :param func converter: function to handle field conversions
+    :param fmt: the format handler
+    :type fmt: :class:`~uberserk.formats.FormatHandler`
+    :param int timeout: milliseconds without data after which the stream is
+        considered dead
+    :param int backoff: milliseconds before the second reconnect attempt,
+        doubled on each following one
+    :param int max_backoff: maximum milliseconds between reconnect attempts
+    """
+
+    def __init__(self, requestor, path, converter=noop, fmt=None,
+                 timeout=STALE_MS, backoff=BACKOFF_MS,
+                 max_backoff=MAX_BACKOFF_MS):
+        self._r = requestor
+        self.path = path
+        self.converter = converter
+        self.fmt = fmt
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.connects = 0
+        self.closed = False
+        self._it = None
+        self._last = None
+        self._delay = 0
+        self._retry_at = ticks_ms()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.closed:
+            raise StopIteration
+        if self._it is None and not self._connect():
+            self._idle()
+            return None
+        try:
+            item = next(self._it)
+        except StopIteration:
+            self._drop()
+            return None
+        except exceptions.BodyTooLargeError:
+            # would be sent again on every reconnect
+            self._r.metrics.incr('stream_too_large')
+            self.close()
+            raise StopIteration
+        except (OSError, ValueError, exceptions.ApiError):
+            # includes lines that do not decode
+            self._drop()
+            return None
+
+        now = ticks_ms()
+        if item is None:
+            if ticks_diff(now, self._last) > self.timeout:
+                self._r.metrics.incr('stream_stale')
+                self._drop()
+            self._idle()
+            return None
+        self._last = now
+        self._delay = 0
+        if not item:
+            return item  # keep-alive
+        return self.accept(item)
+
+    def open(self):
+        """Open the underlying stream.
+
+        :return: iterator over the events, ``None`` while idle
+        """
+        return self._r.get(self.path, stream=True, idle=True, fmt=self.fmt,
+                           converter=self.converter)
+
+    def accept(self, event):
+        """Return the event to hand to the consumer or ``None`` to drop it.
+
+        :param dict event: a parsed event
+        """
+        return event
+
+    def close(self):
+        """Close the stream for good."""
+        self.closed = True
+        self._release()
+
+    def _idle(self):
+        # nothing to hand over, a good moment for a due collection
+        policy = self._r.gc_policy
+        if policy is not None:
+            policy.idle()
+
+    def _connect(self):
+        now = ticks_ms()
+        if ticks_diff(self._retry_at, now) > 0:
+            return False
+        wait = self._r.rate_limiter.delay(self.path)
+        if wait:
+            self._retry_at = ticks_add(now, wait)
+            return False
+        try:
+            self._it = self.open()
+        except exceptions.RateLimitError:
+            self._retry_at = ticks_add(now, self._r.rate_limiter.delay(self.path))
+            return False
+        except exceptions.ResponseError as e:
+            if e.status_code < 500:
+                raise
+            self._schedule()
+            return False
+        except exceptions.ApiError:
+            self._schedule()
+            return False
+        self.connects += 1
+        self._last = ticks_ms()
+        if self.connects > 1:
+            self._r.metrics.incr('stream_reconnects')
+        return True
+
+    def _release(self):
+        if self._it is not None:
+            self._it.close()
+            self._it = None
+
+    def _drop(self):
+        self._release()
+        self._schedule()
+
+    def _schedule(self):
+        # the first attempt is immediate, then back off with up to 50% jitter
+        delay = self._delay
+        self._delay = min(self.max_backoff, delay * 2 or self.backoff)
+        if delay:
+            delay += delay * random.getrandbits(8) // 512
+        self._retry_at = ticks_add(ticks_ms(), delay)
+
+
+class EventStream(Stream):
+    """Stream of incoming events that drops events replayed on reconnect.
+
+    :param int remember: number of event IDs kept to detect replays
+    """
+
+    def __init__(self, requestor, path, remember=64, **kwargs):
+        super().__init__(requestor, path, **kwargs)
+        self.remember = remember
+        self._seen = set()
+        self._order = []
+
+    def accept(self, event):
+        kind = event.get('type')
+        body = event.get('game') or event.get('challenge') or {}
+        key = (kind, body.get('id'))
+        if key[1] is None:
+            return event
+        if key in self._seen:
+            return None
+        self._seen.add(key)
+        self._order.append(key)
+        if len(self._order) > self.remember:
+            self._seen.discard(self._order.pop(0))
+        return event
+
+
+class MoveTracker:
+    """Tell the moves new in each state of a game from those seen before.
+
+    Only the part of the ``moves`` string after the known moves is split.
+    The known moves are verified as a whole by a string comparison, as
+    states dropped by coalescing can hide a takeback followed by other moves
+    ending the same way. When the known moves are no longer a prefix, all
+    moves are new again.
+    """
+
+    def __init__(self):
+        self.moves = ''
+        self.ply = 0
+
+    def update(self, moves):
+        """Record the moves of a new state.
+
+        :param str moves: all moves of the game in UCI, space separated
+        :return: the new moves and whether the known ones were taken back
+        :rtype: tuple
+        """
+        n = len(self.moves)
+        if moves.startswith(self.moves) and \
+                (len(moves) == n or not n or moves[n] == ' '):
+            new = moves[n:].split()
+            takeback = False
+        else:
+            new = moves.split()
+            takeback = True
+            self.ply = 0
+        self.moves = moves
+        self.ply += len(new)
+        return new, takeback
+
+
+class GameStream(Stream):
+    """Stream of game states that hands the consumer only new states.
+
+    After a reconnect the server starts over with a ``gameFull`` event. It is
+    dropped when nothing changed meanwhile and handed over as a ``gameState``
+    event otherwise. Iteration stops once the game is over.
+
+    Every state gets ``newMoves``, the moves made since the previous state,
+    and ``ply``, the number of moves so far. When moves were taken back
+    ``takeback`` is ``True`` and ``newMoves`` holds all moves of the game.
+
+    With ``track_position`` the current position is kept in :attr:`position`
+    and every state gets ``changed``, the indices of the squares whose piece
+    changed, and ``opening``, the name of the opening reached, if any.
+
+    :param str game_id: ID of the game
+    :param dict pending: moves sent and not seen yet as ``(move, ticks)`` by
+        game ID, the time until they show up is recorded as ``move_rtt``
+    :param bool track_position: keep the current position
+    :param str initial_fen: starting position if it is not in ``gameFull``
+    :param dict positions: tracked positions by game ID, the position of
+        this game is kept there while the stream is open
+    :param dict trackers: move trackers by game ID, the tracker of this game
+        is taken from there, e.g. one restored after a deep sleep, and kept
+        there while the stream is open
+    """
+
+    def __init__(self, requestor, path, game_id=None, pending=None,
+                 track_position=False, initial_fen='startpos', positions=None,
+                 trackers=None, **kwargs):
+        super().__init__(requestor, path, **kwargs)
+        self.game_id = game_id
+        self.pending = pending if pending is not None else {}
+        self.state = None
+        self.trackers = trackers if trackers is not None else {}
+        self.tracker = self.trackers.get(game_id) or MoveTracker()
+        self.trackers[game_id] = self.tracker
+        self.initial_fen = initial_fen
+        self.position = PositionTracker(initial_fen) if track_position else None
+        self.positions = positions if positions is not None else {}
+        self.opening = None
+        if self.position is not None:
+            self.positions[game_id] = self.position
+        self._finished = False
+
+    def __next__(self):
+        if self._finished:
+            self.close()
+        return super().__next__()
+
+    def close(self):
+        self._forget(self.positions, self.position)
+        self._forget(self.trackers, self.tracker)
+        super().close()
+
+    def _forget(self, registry, value):
+        # an untracked position is None and would match a missing entry;
+        # leave entries another stream of the game registered since
+        if value is not None and registry.get(self.game_id) is value:
+            del registry[self.game_id]
+
+    def accept(self, event):
+        kind = event.get('type')
+        if kind == 'gameFull':
+            state = event['state']
+            if self.state is None and event.get('initialFen'):
+                self.initial_fen = event['initialFen']
+                if self.position is not None:
+                    self.position.set_fen(self.initial_fen)
+            if self.state is None and self.position is not None and \
+                    self.tracker.ply:
+                # resumed with a restored tracker, catch up with its moves
+                self.position.apply(self.tracker.moves.split())
+            if self.state is not None:
+                # reconnected, resume from the known state
+                if self._key(state) == self._key(self.state):
+                    return None
+                event = self.converter(state)
+        elif kind == 'gameState':
+            state = event
+            if self.state is not None and \
+                    self._key(state) == self._key(self.state):
+                return None
+        else:
+            return event
+        self.state = state
+        new, takeback = self.tracker.update(state.get('moves', ''))
+        state['newMoves'] = new
+        state['ply'] = self.tracker.ply
+        state['takeback'] = takeback
+        if self.position is not None:
+            if takeback:
+                # replayed from the start, only the boards tell what changed
+                before = bytes(self.position.board)
+                self.position.set_fen(self.initial_fen)
+                self.position.apply(new)
+                board = self.position.board
+                changed = self.position.changed = [
+                    i for i in range(64) if board[i] != before[i]]
+            else:
+                changed = self.position.apply(new)
+            state['changed'] = changed
+            if takeback:
+                # the opening reached before may be taken back as well
+                self.opening = self._replay_opening(new)
+            elif self.tracker.ply <= openings.MAX_PLY:
+                self.opening = openings.identify_position(self.position) or \
+                    self.opening
+            state['opening'] = self.opening
+        self._check_pending(new)
+        if state.get('status') not in LIVE_STATUSES:
+            self._finished = True
+        return event
+
+    def _replay_opening(self, moves):
+        # the latest opening reached by the moves, walked from the start
+        position = PositionTracker(self.initial_fen)
+        opening = openings.identify_position(position)
+        for move in moves[:openings.MAX_PLY]:
+            position.push(move)
+            opening = openings.identify_position(position) or opening
+        return opening
+
+    def _check_pending(self, new):
+        sent = self.pending.get(self.game_id)
+        if sent is not None and sent[0] in new:
+            del self.pending[self.game_id]
+            self._r.metrics.observe('move_rtt',
+                                    ticks_diff(ticks_ms(), sent[1]))
+
+    @staticmethod
+    def _key(state):
+        return tuple(state.get(k) for k in STATE_KEYS)
+
+
+class Broadcast:
+    """Hand every event of one stream to several subscribers.
+
+    Each event is read from the source once, when a subscriber with an
+    empty queue asks for the next one, and the same object is queued for
+    every subscriber. Subscribers share it and must not modify it.
+
+    Each subscriber has a queue of ``size`` events and a policy for a full
+    queue: with ``DROP`` new events are dropped, with ``LATEST`` the oldest
+    queued event is, and with ``BLOCK`` no more events are read from the
+    source until the subscriber catches up, holding back all subscribers.
+    Dropped events are counted in :attr:`Subscription.dropped`.
+
+    ::
+
+        events = Broadcast(client.board.stream_incoming_events())
+        display = events.subscribe(size=1, policy=LATEST)
+        log = events.subscribe(size=32, policy=BLOCK)
+
+    :param source: stream to read events from, e.g. a :class:`Stream`
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.subscribers = []
+        self.done = False
+
+    def subscribe(self, size=8, policy=LATEST):
+        """Add a subscriber.
+
+        :param int size: maximum number of events queued
+        :param str policy: ``DROP``, ``LATEST`` or ``BLOCK``
+        :return: iterator over the events, ``None`` while there is none
+        :rtype: :class:`Subscription`
+        """
+        subscription = Subscription(self, size, policy)
+        self.subscribers.append(subscription)
+        return subscription
+
+    def pump(self):
+        """Read the next event of the source and queue it for everyone.
+
+        :return: ``True`` if an event was queued
+        :rtype: bool
+        """
+        if self.done:
+            return False
+        for subscription in self.subscribers:
+            if subscription.policy == BLOCK and \
+                    len(subscription.queue) >= subscription.size:
+                return False
+        try:
+            event = next(self.source)
+        except StopIteration:
+            self.done = True
+            return False
+        if not event:
+            return False
+        for subscription in self.subscribers:
+            subscription.put(event)
+        return True
+
+    def close(self):
+        """Close the source and end all subscriptions."""
+        self.done = True
+        self.subscribers = []
+        close = getattr(self.source, 'close', None)
+        if close is not None:
+            close()
+
+
+class Subscription:
+    """Queue of a subscriber of a :class:`Broadcast`.
+
+    Iteration stops once the source ended and the queue is empty.
+    """
+
+    def __init__(self, broadcast, size, policy):
+        if policy not in (DROP, LATEST, BLOCK):
+            raise ValueError('Unknown policy: %s' % policy)
+        self.broadcast = broadcast
+        self.size = size
+        self.policy = policy
+        self.queue = []
+        self.dropped = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.queue:
+            self.broadcast.pump()
+        if self.queue:
+            return self.queue.pop(0)
+        if self.broadcast.done:
+            raise StopIteration
+        return None
+
+    def put(self, event):
+        """Queue an event, applying the policy if the queue is full."""
+        if len(self.queue) >= self.size:
+            self.dropped += 1
+            if self.policy == DROP:
+                return
+            self.queue.pop(0)
+        self.queue.append(event)
+
+    def close(self):
+        """Stop receiving events, the last subscriber closes the source."""
+        subscribers = self.broadcast.subscribers
+        if self in subscribers:
+            subscribers.remove(self)
+            if not subscribers:
+                self.broadcast.close()
+        self.queue = []
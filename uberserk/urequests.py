@@ -13,40 +13,235 @@ See license text in LICENSE-MIT.txt.
 
 # pylint:disable=attribute-defined-outside-init
 
+import time
 import usocket
-import ujson
+from . import jsonlib as ujson
+from .utils import ticks_ms, ticks_diff
 import ussl
 
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
 _all__ = (
+    'BufferPool',
+    'Connection',
     'Response',
+    'dns_restore',
+    'dns_snapshot',
     'request',
 )
 
 ITER_CHUNK_SIZE = 512
 
+# Number and size of the buffers preallocated for a client, one buffer holds
+# a line of a stream up to this size before it spills to the heap
+BUFFER_COUNT = 4
+BUFFER_SIZE = 1024
+
+
+class BufferPool:
+    """Fixed-size buffers allocated once and reused.
+
+    Reusing the same few buffers for socket reads, line assembly and request
+    serialization keeps long-running streams from fragmenting the heap.
+    Taking a buffer from an empty pool allocates a new one and counts it in
+    :attr:`misses`, at most ``count`` buffers are kept when given back. The
+    pool may be shared by threads, such as the workers of
+    :func:`~uberserk.utils.fan_out`.
+
+    :param int count: number of buffers
+    :param int size: size of each buffer in bytes
+    """
+
+    def __init__(self, count=BUFFER_COUNT, size=BUFFER_SIZE):
+        self.count = count
+        self.size = size
+        self.misses = 0
+        self._free = [bytearray(size) for _ in range(count)]
+        self._lock = _thread.allocate_lock() if _thread else None
+
+    def take(self):
+        if self._lock:
+            self._lock.acquire()
+        try:
+            if self._free:
+                return self._free.pop()
+            self.misses += 1
+        finally:
+            if self._lock:
+                self._lock.release()
+        return bytearray(self.size)
+
+    def give(self, buf):
+        if len(buf) != self.size:
+            return
+        if self._lock:
+            self._lock.acquire()
+        try:
+            if len(self._free) < self.count:
+                self._free.append(buf)
+        finally:
+            if self._lock:
+                self._lock.release()
+
+
+class _Buffered:
+    """Collect small writes to a socket in a buffer and send them at once."""
+
+    def __init__(self, sock, buf):
+        self.sock = sock
+        self.buf = buf
+        self.view = memoryview(buf)
+        self.fill = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode()
+        n = len(data)
+        if self.fill + n > len(self.buf):
+            self.flush()
+            if n > len(self.buf):
+                self.sock.write(data)
+                return
+        self.view[self.fill:self.fill + n] = data
+        self.fill += n
+
+    def flush(self):
+        if self.fill:
+            self.sock.write(self.view[:self.fill])
+            self.fill = 0
+
+
+# Seconds a resolved address is reused for
+DNS_TTL = 3600
+
+# Resolved addresses by "host:port", reused by all requests until they expire
+# or a connect to them fails
+dns_cache = {}
+
+# Expiry of the resolved addresses by "host:port", in seconds of time.time()
+# as that keeps counting through a deep sleep, unlike the ticks
+dns_expiry = {}
+
+
+def _resolve(host, port):
+    key = "%s:%d" % (host, port)
+    ai = dns_cache.get(key)
+    now = time.time()
+    if ai is None or now >= dns_expiry.get(key, 0):
+        ai = usocket.getaddrinfo(host, port, 0, usocket.SOCK_STREAM)[0]
+        dns_cache[key] = ai
+        dns_expiry[key] = now + DNS_TTL
+    return key, ai
+
+
+def dns_snapshot():
+    """Return the DNS cache as JSON serializable lists.
+
+    Entries whose address is not a tuple, as on some ports, are left out.
+    """
+    return {key: [ai[0], ai[1], ai[2], list(ai[-1]), dns_expiry.get(key, 0)]
+            for key, ai in dns_cache.items() if isinstance(ai[-1], tuple)}
+
+
+def dns_restore(entries):
+    """Fill the DNS cache from the result of :func:`dns_snapshot`.
+
+    Expired entries are left out.
+    """
+    now = time.time()
+    for key, ai in entries.items():
+        expiry = ai[4] if len(ai) > 4 else 0
+        if expiry > now:
+            dns_cache[key] = (ai[0], ai[1], ai[2], "", tuple(ai[3]))
+            dns_expiry[key] = expiry
+
+
+def _find_newline(buf, start, end):
+    # bytearray has no find() on MicroPython
+    find = getattr(buf, 'find', None)
+    if find is not None:
+        return find(b"\n", start, end)
+    for i in range(start, end):
+        if buf[i] == 10:
+            return i
+    return -1
+
+
+class BodyTooLarge(ValueError):
+    """Response body or line larger than the response allows."""
+
+
+class _Stale(OSError):
+    """Connection closed by the server before a byte of the response."""
+
 
 class Response:
-    def __init__(self, f):
+    def __init__(self, f, content=None, stream=True):
         self.raw = f
         self.encoding = "utf-8"
-        self._cached = None
+        self._cached = content
         self._content = False
         self._content_consumed = False
         self._next = None
-        self.raw.setblocking(False)
-        print('set nonblocking')
+        self.eof = False
+        self.length = None
+        self.max_body = None
+        self.pool = None
+        self._taken = []
+        if f is not None and stream:
+            self.raw.setblocking(False)
+            print('set nonblocking')
 
     def close(self):
         if self.raw:
             self.raw.close()
             self.raw = None
         self._cached = None
+        while self._taken:
+            self.pool.give(self._taken.pop())
+
+    def _take(self, size):
+        if self.pool is None or size > self.pool.size:
+            return bytearray(size)
+        buf = self.pool.take()
+        self._taken.append(buf)
+        return buf
+
+    def _check_size(self, size):
+        if self.max_body is not None and size > self.max_body:
+            raise BodyTooLarge("%d bytes exceed %d" % (size, self.max_body))
 
     @property
     def content(self):
         if self._cached is None:
             try:
-                self._cached = self.raw.read()
+                if self.length is not None:
+                    # allocate once, never more than max_body
+                    self._check_size(self.length)
+                    buf = bytearray(self.length)
+                    view = memoryview(buf)
+                    pos = 0
+                    while pos < self.length:
+                        n = self.readinto(view[pos:])
+                        if not n:
+                            if n is None:
+                                continue
+                            break
+                        pos += n
+                    self._cached = bytes(view[:pos])
+                else:
+                    parts = []
+                    size = 0
+                    for chunk in self.iter_content():
+                        if chunk is None:
+                            continue
+                        size += len(chunk)
+                        self._check_size(size)
+                        parts.append(chunk)
+                    self._cached = b"".join(parts)
             finally:
                 self.raw.close()
                 self.raw = None
@@ -59,21 +254,116 @@ class Response:
     def json(self):
         return ujson.loads(self.content)
 
+    def readinto(self, buf):
+        """Read into a caller-supplied buffer.
+
+        :return: number of bytes read, 0 once the body ended or ``None`` if
+            no data is available yet
+        """
+        if self.raw is None or self.eof:
+            return 0
+        n = self.raw.readinto(buf)
+        if n == 0:
+            self.eof = True
+        return n
+
+    def iter_content(self, chunk_size=ITER_CHUNK_SIZE, buffer=None):
+        """Iterate over the body in chunks of at most ``chunk_size`` bytes.
+
+        ``None`` is yielded whenever no data is available yet. Given a
+        ``buffer``, chunks are memoryviews of it and only valid until the
+        next chunk is read, otherwise they are new bytes.
+        """
+        view = memoryview(buffer)[:chunk_size] if buffer is not None else None
+        while self.raw is not None and not self.eof:
+            if view is not None:
+                n = self.readinto(view)
+                data = view[:n] if n else n
+            else:
+                data = self.raw.read(chunk_size)
+                if data == b"":
+                    self.eof = True
+            if data is None:
+                yield None
+            elif data:
+                yield data
+
+    def iter_lines(self, chunk_size=ITER_CHUNK_SIZE):
+        """Iterate over the body line by line, without line endings.
+
+        Reads and lines are assembled in two buffers of the pool, if any,
+        only the complete line is copied out. ``None`` is yielded whenever no
+        complete line is available yet. A line longer than ``max_body``
+        raises :class:`BodyTooLarge`.
+        """
+        chunk = self._take(chunk_size)
+        view = memoryview(chunk)[:chunk_size]
+        line = memoryview(self._take(BUFFER_SIZE))
+        fill = 0
+        spill = None  # a line outgrowing the line buffer
+        while True:
+            n = self.readinto(view)
+            if n is None:
+                yield None
+                continue
+            if not n:
+                break
+            start = 0
+            while start < n:
+                end = _find_newline(chunk, start, n)
+                stop = n if end < 0 else end
+                size = stop - start
+                if spill is None and fill + size <= len(line):
+                    line[fill:fill + size] = view[start:stop]
+                else:
+                    if spill is None:
+                        spill = bytes(line[:fill])
+                    spill += bytes(view[start:stop])
+                fill += size
+                self._check_size(fill)
+                if end < 0:
+                    break
+                yield _line(line, fill, spill)
+                fill = 0
+                spill = None
+                start = end + 1
+        if fill:
+            yield _line(line, fill, spill)
+
     def __iter__(self):
         """Allows you to use a response as an iterator."""
         return self
 
     def __next__(self):
+        """Return all data available now, ``b''`` if there is none yet.
+
+        A non-blocking read returns ``None`` while the connection is idle and
+        ``b''`` once the peer closed it, iteration stops after the latter.
+        """
+        if self.raw is None or self.eof:
+            raise StopIteration
         _content = b''
         data = self.raw.read()
         while data:
             _content += data
             data = self.raw.read()
+        if data is not None:
+            self.eof = True
+            if not _content:
+                raise StopIteration
         self._cached = _content
         return _content
 
 
-def request(method, url, data=None, json=None, headers={}, stream=None):
+def _line(view, fill, spill):
+    if spill is not None:
+        return spill[:-1] if spill.endswith(b"\r") else spill
+    if fill and view[fill - 1] == 13:
+        fill -= 1
+    return bytes(view[:fill])
+
+
+def _split_url(url):
     try:
         proto, dummy, host, path = url.split("/", 3)
     except ValueError:
@@ -89,38 +379,224 @@ def request(method, url, data=None, json=None, headers={}, stream=None):
     if ":" in host:
         host, port = host.split(":", 1)
         port = int(port)
+    return proto, host, port, path
+
+
+class Connection:
+    """Persistent HTTP/1.1 connection to one host for small requests.
+
+    The connection is opened (DNS, TCP and TLS) ahead of the first request
+    and kept alive between requests. A connection idle for longer than
+    ``keepalive_ms`` is reopened before use, as the server has likely closed
+    it already.
+    """
+
+    keepalive_ms = 50000
+
+    def __init__(self, url, pool=None):
+        self.proto, self.host, self.port, _ = _split_url(url)
+        self.pool = pool
+        self.sock = None
+        self.used = None
+
+    def open(self):
+        self.close()
+        key, ai = _resolve(self.host, self.port)
+        s = usocket.socket(ai[0], ai[1], ai[2])
+        try:
+            try:
+                s.connect(ai[-1])
+            except OSError:
+                dns_cache.pop(key, None)
+                raise
+            if self.proto == "https:":
+                s = ussl.wrap_socket(s, server_hostname=self.host)
+        except OSError:
+            s.close()
+            raise
+        self.sock = s
+        self.used = ticks_ms()
+
+    def close(self):
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+    def warm(self):
+        """Reopen the connection if it is closed or has been idle too long."""
+        if self.sock is None or \
+                ticks_diff(ticks_ms(), self.used) > self.keepalive_ms:
+            self.open()
+
+    def request(self, method, url, data=None, json=None, headers={}):
+        """Send a request and read the whole response.
+
+        A request on a reused connection that the server closed without
+        answering, as it does with connections idle for too long, is sent
+        again once on a fresh connection. A request failing otherwise is not,
+        as the server may have acted on it.
+        """
+        path = _split_url(url)[3]
+        if json is not None:
+            assert data is None
+            data = ujson.dumps(json)
+        reused = self.sock is not None
+        self.warm()
+        try:
+            return self._send(method, path, data, json is not None, headers)
+        except _Stale:
+            self.close()
+            if not reused:
+                raise
+        except OSError:
+            self.close()
+            raise
+        self.open()
+        try:
+            return self._send(method, path, data, json is not None, headers)
+        except OSError:
+            self.close()
+            raise
 
-    ai = usocket.getaddrinfo(host, port, 0, usocket.SOCK_STREAM)
-    ai = ai[0]
+    def _send(self, method, path, data, is_json, headers):
+        s = self.sock
+        buf = self.pool.take() if self.pool else bytearray(ITER_CHUNK_SIZE)
+        try:
+            w = _Buffered(s, buf)
+            w.write(method)
+            w.write(b" /")
+            w.write(path)
+            w.write(b" HTTP/1.1\r\nHost: ")
+            w.write(self.host)
+            w.write(b"\r\n")
+            for k in headers:
+                w.write(k)
+                w.write(b": ")
+                w.write(headers[k])
+                w.write(b"\r\n")
+            if is_json:
+                w.write(b"Content-Type: application/json\r\n")
+            w.write(b"Content-Length: ")
+            w.write(str(len(data or b"")))
+            w.write(b"\r\n\r\n")
+            if data:
+                w.write(data)
+            w.flush()
+        finally:
+            if self.pool:
+                self.pool.give(buf)
+
+        l = s.readline()
+        if not l:
+            raise _Stale("Connection closed")
+        l = l.split(None, 2)
+        status = int(l[1])
+        reason = l[2].rstrip() if len(l) > 2 else ""
+        length = None
+        chunked = False
+        # kept alive by default from HTTP/1.1 on only
+        keep = l[0] != b"HTTP/1.0"
+        retry_after = None
+        while True:
+            l = s.readline()
+            if not l or l == b"\r\n":
+                break
+            name = l.split(b":", 1)[0].lower()
+            if name == b"content-length":
+                length = int(l[15:])
+            elif name == b"transfer-encoding":
+                chunked = b"chunked" in l
+            elif name == b"connection":
+                if b"close" in l.lower():
+                    keep = False
+                elif b"keep-alive" in l.lower():
+                    keep = True
+            elif name == b"retry-after":
+                try:
+                    retry_after = int(l[12:])
+                except ValueError:
+                    pass
+
+        if chunked:
+            body = b""
+            while True:
+                size = int(s.readline().split(b";", 1)[0], 16)
+                if size:
+                    body += s.read(size)
+                s.readline()
+                if not size:
+                    break
+        elif length is not None:
+            body = s.read(length) if length else b""
+        else:
+            body = s.read()
+            keep = False
+
+        if keep:
+            self.used = ticks_ms()
+        else:
+            self.close()
+        resp = Response(None, body)
+        resp.status_code = status
+        resp.reason = reason
+        resp.retry_after = retry_after
+        return resp
+
+
+def request(method, url, data=None, json=None, headers={}, stream=None,
+            pool=None):
+    proto, host, port, path = _split_url(url)
+
+    key, ai = _resolve(host, port)
 
     s = usocket.socket(ai[0], ai[1], ai[2])
     try:
-        s.connect(ai[-1])
+        try:
+            s.connect(ai[-1])
+        except OSError:
+            dns_cache.pop(key, None)
+            raise
         if proto == "https:":
             s = ussl.wrap_socket(s, server_hostname=host)
-        s.write(b"%s /%s HTTP/1.0\r\n" % (method, path))
-        if not "Host" in headers:
-            s.write(b"Host: %s\r\n" % host)
-        # Iterate over keys to avoid tuple alloc
-        for k in headers:
-            s.write(k)
-            s.write(b": ")
-            s.write(headers[k])
-            s.write(b"\r\n")
-        if json is not None:
-            assert data is None
-            data = ujson.dumps(json)
-            s.write(b"Content-Type: application/json\r\n")
-        if data:
-            s.write(b"Content-Length: %d\r\n" % len(data))
-        s.write(b"\r\n")
-        if data:
-            s.write(data)
+        buf = pool.take() if pool else bytearray(ITER_CHUNK_SIZE)
+        try:
+            w = _Buffered(s, buf)
+            w.write(method)
+            w.write(b" /")
+            w.write(path)
+            w.write(b" HTTP/1.0\r\n")
+            if not "Host" in headers:
+                w.write(b"Host: ")
+                w.write(host)
+                w.write(b"\r\n")
+            # Iterate over keys to avoid tuple alloc
+            for k in headers:
+                w.write(k)
+                w.write(b": ")
+                w.write(headers[k])
+                w.write(b"\r\n")
+            if json is not None:
+                assert data is None
+                data = ujson.dumps(json)
+                w.write(b"Content-Type: application/json\r\n")
+            if data:
+                w.write(b"Content-Length: ")
+                w.write(str(len(data)))
+                w.write(b"\r\n")
+            w.write(b"\r\n")
+            if data:
+                w.write(data)
+            w.flush()
+        finally:
+            if pool:
+                pool.give(buf)
 
         l = s.readline()
         l = l.split(None, 2)
         status = int(l[1])
         reason = ""
+        retry_after = None
+        length = None
         if len(l) > 2:
             reason = l[2].rstrip()
         while True:
@@ -130,13 +606,23 @@ def request(method, url, data=None, json=None, headers={}, stream=None):
             if l.startswith(b"Transfer-Encoding:"):
                 if b"chunked" in l:
                     raise ValueError("Unsupported " + l)
+            elif l.startswith(b"Retry-After:"):
+                try:
+                    retry_after = int(l[12:])
+                except ValueError:
+                    pass
+            elif l.startswith(b"Content-Length:"):
+                length = int(l[15:])
             elif l.startswith(b"Location:") and not 200 <= status <= 299:
                 raise NotImplementedError("Redirects not yet supported")
     except OSError:
         s.close()
         raise
 
-    resp = Response(s)
+    resp = Response(s, stream=stream)
+    resp.pool = pool
     resp.status_code = status
     resp.reason = reason
+    resp.retry_after = retry_after
+    resp.length = length
     return resp
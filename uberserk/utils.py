@@ -2,6 +2,31 @@
 from .datetime import datetime
 from .datetime import timezone
 import collections
+import os
+import time
+
+try:
+    import _thread
+except ImportError:
+    _thread = None
+
+try:
+    from time import ticks_ms, ticks_us, ticks_diff, ticks_add, sleep_ms
+except ImportError:
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_us():
+        return int(time.monotonic() * 1000000)
+
+    def ticks_diff(new, old):
+        return new - old
+
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def sleep_ms(ms):
+        time.sleep(ms / 1000)
 
 
 def to_millis(dt):
@@ -80,6 +105,161 @@ def noop(arg):
     return arg
 
 
+class Interner:
+    """Bounded table handing out one shared copy of equal strings.
+
+    Once the table is full new strings are returned as they are.
+
+    :param int size: maximum number of strings kept
+    :param values: keys whose string values are interned too
+    """
+
+    def __init__(self, size=512,
+                 values=('status', 'variant', 'speed', 'color')):
+        self.size = size
+        self.values = values
+        self.table = {}
+
+    def __call__(self, value):
+        shared = self.table.get(value)
+        if shared is None:
+            if len(self.table) >= self.size:
+                return value
+            shared = self.table[value] = value
+        return shared
+
+    def walk(self, data):
+        """Return decoded JSON with its keys and enum-like values interned.
+
+        :param data: decoded JSON
+        :return: equal data sharing strings with earlier data
+        """
+        if isinstance(data, dict):
+            result = {}
+            for key, value in data.items():
+                key = self(key)
+                if key in self.values and isinstance(value, str):
+                    value = self(value)
+                elif isinstance(value, (dict, list)):
+                    value = self.walk(value)
+                result[key] = value
+            return result
+        if isinstance(data, list):
+            return [self.walk(v) if isinstance(v, (dict, list)) else v
+                    for v in data]
+        return data
+
+
+def chunked(items, size):
+    """Split a sequence into consecutive batches of at most ``size`` items.
+
+    :param items: sequence to split
+    :param int size: maximum number of items per batch
+    :return: iterator over the batches
+    :rtype: iter
+    """
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def replace_file(src, dst):
+    """Move a file over another one.
+
+    The move is atomic on file systems that rename over an existing file,
+    such as littlefs. Elsewhere, such as on FAT, the target is removed
+    first and a reset in between leaves only ``src``, which
+    :func:`recover_file` moves into place.
+
+    :param str src: the new file
+    :param str dst: the file to replace
+    """
+    try:
+        os.rename(src, dst)
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        os.rename(src, dst)
+
+
+def recover_file(src, dst):
+    """Finish a :func:`replace_file` cut short after removing the target.
+
+    :param str src: the new file
+    :param str dst: the file it replaces
+    """
+    try:
+        os.stat(dst)
+    except OSError:
+        try:
+            os.rename(src, dst)
+        except OSError:
+            pass
+
+
+def fan_out(func, items, workers=1):
+    """Call a function on each item with a bounded number of workers.
+
+    Results are yielded in the order of ``items`` as soon as they are ready.
+    Without ``_thread`` support, or with a single worker, the calls are made
+    lazily one after another.
+
+    :param func func: function to call on each item
+    :param items: items to process
+    :param int workers: maximum number of concurrent calls
+    :return: iterator over the results
+    :rtype: iter
+    """
+    items = list(items)
+    if workers <= 1 or _thread is None or len(items) < 2:
+        for item in items:
+            yield func(item)
+        return
+
+    lock = _thread.allocate_lock()
+    results = {}
+    state = {'next': 0}
+
+    def worker():
+        while True:
+            lock.acquire()
+            i = state['next']
+            state['next'] = i + 1
+            lock.release()
+            if i >= len(items):
+                return
+            try:
+                result = (True, func(items[i]))
+            except Exception as e:
+                result = (False, e)
+            lock.acquire()
+            results[i] = result
+            lock.release()
+
+    for _ in range(min(workers, len(items))):
+        _thread.start_new_thread(worker, ())
+
+    try:
+        for i in range(len(items)):
+            while True:
+                lock.acquire()
+                result = results.pop(i, None)
+                lock.release()
+                if result is not None:
+                    break
+                sleep_ms(5)
+            ok, value = result
+            if not ok:
+                raise value
+            yield value
+    finally:
+        # stop idle workers from picking up batches nobody will read
+        lock.acquire()
+        state['next'] = len(items)
+        lock.release()
+
+
 def build_adapter(mapper, sep='.'):
     """Build a data adapter.
 
@@ -133,3 +313,42 @@ def build_adapter(mapper, sep='.'):
         return result
 
     return adapter
+
+
+def build_projection(fields, sep='.'):
+    """Build a function keeping only some fields of an object.
+
+    Unlike :func:`build_adapter` the structure of the object is kept, nested
+    fields are given by their location. For example:
+
+    .. code-block:: python
+
+        >>> project = build_projection(['id', 'perfs.blitz.rating'])
+        >>> project({'id': 'rhgrant10',
+        ...   'perfs': {'blitz': {'games': 3, 'rating': 1500},
+        ...             'bullet': {'games': 1, 'rating': 1400}},
+        ...   'profile': {'country': 'US'}})
+        {'id': 'rhgrant10', 'perfs': {'blitz': {'rating': 1500}}}
+
+    :param list fields: locations of the fields to keep
+    :param str sep: nested key delimiter
+    :return: projection function
+    :rtype: func
+    """
+    tree = {}
+    for field in fields:
+        node = tree
+        for key in field.split(sep):
+            node = node.setdefault(key, {})
+
+    def project(data, tree=tree):
+        result = {}
+        for key, subtree in tree.items():
+            if key in data:
+                value = data[key]
+                if subtree and isinstance(value, dict):
+                    value = project(value, subtree)
+                result[key] = value
+        return result
+
+    return project